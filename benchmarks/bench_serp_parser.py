@@ -0,0 +1,110 @@
+"""SERP 解析器微基准：在 fixtures 中保存的搜索结果页上统计每页解析耗时
+
+用法：
+    python benchmarks/bench_serp_parser.py
+    python benchmarks/bench_serp_parser.py --iterations 200 --json bench_serp.json
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from serp_parser import parse_serp  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def legacy_parse(page_html: str, top_k: int):
+    """原 _search_bing_with_requests 中的 BeautifulSoup 解析逻辑，作为对比基线"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(page_html, "lxml")
+    result_containers = []
+    result_containers.extend(soup.find_all(class_="b_algo"))
+    for div in soup.find_all("div"):
+        h2 = div.find("h2")
+        if h2 and h2.find("a"):
+            result_containers.append(div)
+
+    results = []
+    seen_links = set()
+    for container in result_containers:
+        h2 = container.find("h2")
+        if not h2:
+            continue
+        link = h2.find("a")
+        if not link:
+            continue
+        title = link.get_text(strip=True)
+        href = link.get("href")
+        if not href or not href.startswith("http") or len(title) < 5 or href in seen_links:
+            continue
+        seen_links.add(href)
+        p_tag = container.find("p")
+        summary = p_tag.get_text(strip=True)[:150] if p_tag else ""
+        results.append({"title": title, "link": href, "summary": summary})
+        if len(results) >= top_k:
+            break
+    return results
+
+
+def measure(parser, page_html: str, top_k: int, iterations: int):
+    timings = []
+    results = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        results = parser(page_html, top_k)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "results": len(results),
+        "median_ms": statistics.median(timings),
+        "mean_ms": statistics.mean(timings),
+        "min_ms": min(timings),
+        "max_ms": max(timings),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SERP 解析器微基准")
+    parser.add_argument("--iterations", type=int, default=50, help="每个页面解析次数")
+    parser.add_argument("--top-k", type=int, default=10, help="每页解析的结果数量")
+    parser.add_argument("--fixtures", default=FIXTURES, help="SERP 页面目录")
+    parser.add_argument("--no-legacy", action="store_true", help="不运行 BeautifulSoup 基线")
+    parser.add_argument("--json", help="把结果写入 JSON 文件，便于与历史结果对比")
+    args = parser.parse_args()
+
+    parsers = {"serp_parser": parse_serp}
+    if not args.no_legacy:
+        try:
+            import bs4  # noqa: F401
+            parsers["legacy_bs4"] = legacy_parse
+        except ImportError:
+            print("未安装 beautifulsoup4，跳过基线对比")
+
+    report = {}
+    print(f"{'页面':<24}{'大小(KB)':>10}{'解析器':>14}{'结果数':>8}{'中位数(ms)':>12}{'平均(ms)':>10}")
+    for path in sorted(glob.glob(os.path.join(args.fixtures, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            page_html = f.read()
+        name = os.path.basename(path)
+        report[name] = {}
+        for parser_name, parse in parsers.items():
+            stats = measure(parse, page_html, args.top_k, args.iterations)
+            report[name][parser_name] = stats
+            print(f"{name:<24}{len(page_html) / 1024:>10.1f}{parser_name:>14}{stats['results']:>8}"
+                  f"{stats['median_ms']:>12.3f}{stats['mean_ms']:>10.3f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"结果已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""端到端基准：在本地替身服务（假 Bing、文章站点群、假 LLM）上压测 MCP Server
+
+启动替身服务和一个独立进程的 MCP Server（临时目录中的 config.yaml 指向替身服务），
+按指定并发通过 MCP 客户端调用 search_bing / search_bing_rewrite，统计 QPS、延迟分位数、
+Chromium 内存峰值和创建的页面数。结果可保存为 JSON，并与基线结果对比。
+
+用法：
+    python benchmarks/bench_server.py --tool search_bing --requests 200 --concurrency 8
+    python benchmarks/bench_server.py --tool both --article-mode js --json after.json --baseline before.json
+    python benchmarks/bench_server.py --set BROWSER_WORKERS=4 --set MAX_PAGES=16
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_services  # noqa: E402
+
+try:
+    import psutil
+except ImportError:  # 可选依赖，缺失时不统计 Chromium 内存
+    psutil = None
+
+DESCRIPTIONS = [
+    "电动汽车电池为什么会起火",
+    "夏天给电动车充电要注意什么",
+    "锂电池热失控的原理是什么",
+    "新能源汽车和燃油车哪个更容易着火",
+]
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def start_server(workdir: str, port: int, overrides: Dict) -> subprocess.Popen:
+    """在临时目录中写入配置并启动 MCP Server，正文存储等文件也落在该目录"""
+    with open(os.path.join(workdir, "config.yaml"), "w", encoding="utf-8") as f:
+        yaml.safe_dump(overrides, f, allow_unicode=True)
+    env = dict(os.environ)
+    env["BING_SEARCH_MCP_PORT"] = str(port)
+    log = open(os.path.join(workdir, "server.log"), "w", encoding="utf-8")
+    return subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "mcp_server.py")],
+        cwd=workdir,
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT
+    )
+
+
+async def wait_ready(base_url: str, process: subprocess.Popen, timeout: float = 60.0):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"MCP Server 启动失败，退出码 {process.returncode}")
+            try:
+                if (await client.get(f"{base_url}/metrics")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise TimeoutError("等待 MCP Server 启动超时")
+
+
+async def fetch_json(url: str) -> Dict:
+    import httpx
+
+    async with httpx.AsyncClient() as client:
+        response = await client.get(url, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+
+class RssSampler:
+    """定期采样 MCP Server 下所有 Chromium 进程的常驻内存，记录峰值"""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.peak_mb = 0.0
+        self.samples: List[float] = []
+
+    def sample(self) -> Optional[float]:
+        if psutil is None:
+            return None
+        total = 0
+        try:
+            for child in psutil.Process(self.pid).children(recursive=True):
+                try:
+                    name = child.name().lower()
+                    if "chrom" in name or "headless_shell" in name:
+                        total += child.memory_info().rss
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+        except psutil.Error:
+            return None
+        return total / 1024 / 1024
+
+    async def run(self):
+        while True:
+            rss = self.sample()
+            if rss is not None:
+                self.samples.append(rss)
+                self.peak_mb = max(self.peak_mb, rss)
+            await asyncio.sleep(self.interval)
+
+
+def make_call(tool: str, index: int, args: argparse.Namespace):
+    """生成第 index 次调用的工具名和参数；默认每次查询不同，避免结果全部来自缓存"""
+    if tool == "both":
+        tool = "search_bing" if index % 2 == 0 else "search_bing_rewrite"
+    suffix = "" if args.repeat_queries else f" {index}"
+    if tool == "search_bing":
+        keywords = ["新能源车自燃原因", "动力电池热失控", "电动车起火统计"][index % 3] + suffix
+        return tool, {"keywords": keywords, "top_k": args.top_k}
+    description = DESCRIPTIONS[index % len(DESCRIPTIONS)] + suffix
+    return tool, {"description": description, "rewrite_num": args.rewrite_num, "top_k": args.top_k}
+
+
+async def run_load(mcp_url: str, args: argparse.Namespace) -> Dict:
+    from fastmcp import Client
+
+    latencies: Dict[str, List[float]] = {}
+    errors = 0
+    result_counts: List[int] = []
+    next_index = 0
+
+    async def worker():
+        nonlocal errors, next_index
+        async with Client(mcp_url) as client:
+            while next_index < args.requests:
+                index = next_index
+                next_index += 1
+                tool, arguments = make_call(args.tool, index, args)
+                start = time.monotonic()
+                try:
+                    result = await client.call_tool(tool, arguments)
+                    latencies.setdefault(tool, []).append(time.monotonic() - start)
+                    data = result.data if hasattr(result, "data") else result
+                    result_counts.append(len(data) if isinstance(data, list) else 0)
+                except Exception as e:
+                    errors += 1
+                    print(f"调用 {tool} 失败: {e}")
+
+    start = time.monotonic()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.monotonic() - start
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    report = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "errors": errors,
+        "elapsed": elapsed,
+        "qps": len(all_latencies) / elapsed if elapsed else 0.0,
+        "avg_results": statistics.mean(result_counts) if result_counts else 0.0,
+        "latency": {},
+    }
+    for tool, values in [("all", all_latencies)] + sorted(latencies.items()):
+        report["latency"][tool] = {
+            "count": len(values),
+            "mean": statistics.mean(values) if values else 0.0,
+            "p50": percentile(values, 0.5),
+            "p95": percentile(values, 0.95),
+            "p99": percentile(values, 0.99),
+        }
+    return report
+
+
+def pages_created(server_stats: Dict) -> int:
+    workers = server_stats.get("browser_pool", {}).get("workers", [])
+    return sum((worker.get("page_pool") or {}).get("created", 0) for worker in workers)
+
+
+def print_report(report: Dict, baseline: Optional[Dict]):
+    def delta(path: List[str]) -> str:
+        if baseline is None:
+            return ""
+        old, new = baseline, report
+        for key in path:
+            old = (old or {}).get(key)
+            new = (new or {}).get(key)
+        if not old or new is None:
+            return ""
+        return f"  ({(new - old) / old * 100:+.1f}%)"
+
+    print(f"\n请求数: {report['requests']}  并发: {report['concurrency']}  错误: {report['errors']}")
+    print(f"QPS: {report['qps']:.2f}{delta(['qps'])}  总耗时: {report['elapsed']:.1f}s  平均结果数: {report['avg_results']:.1f}")
+    print(f"{'工具':<24}{'次数':>6}{'mean(s)':>10}{'p50(s)':>10}{'p95(s)':>10}{'p99(s)':>10}")
+    for tool, stats in report["latency"].items():
+        print(f"{tool:<24}{stats['count']:>6}{stats['mean']:>10.3f}{stats['p50']:>10.3f}{stats['p95']:>10.3f}{stats['p99']:>10.3f}"
+              f"{delta(['latency', tool, 'p99'])}")
+    rss = report.get("chromium_rss_peak_mb")
+    print(f"Chromium 内存峰值: {'未知（未安装 psutil）' if rss is None else f'{rss:.0f}MB'}{delta(['chromium_rss_peak_mb'])}")
+    print(f"创建页面数: {report['pages_created']}{delta(['pages_created'])}")
+    print(f"替身服务请求: {json.dumps(report['fake_services'], ensure_ascii=False)}")
+
+
+async def run(args: argparse.Namespace) -> Dict:
+    services = fake_services.from_arguments(args)
+    services_task = await services.start()
+
+    overrides = {
+        "BING_URL": services.base_url,
+        "LLM_BASE_URL": f"{services.base_url}/v1",
+    }
+    for item in args.set:
+        key, _, value = item.partition("=")
+        overrides[key] = yaml.safe_load(value)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    with tempfile.TemporaryDirectory(prefix="bing-bench-") as workdir:
+        process = start_server(workdir, args.port, overrides)
+        sampler_task = None
+        try:
+            await wait_ready(base_url, process)
+            sampler = RssSampler(process.pid)
+            sampler_task = asyncio.create_task(sampler.run())
+
+            report = await run_load(f"{base_url}/mcp", args)
+            server_stats = await fetch_json(f"{base_url}/stats")
+            report["chromium_rss_peak_mb"] = sampler.peak_mb if psutil is not None else None
+            report["pages_created"] = pages_created(server_stats)
+            report["fake_services"] = dict(services.stats)
+            report["overrides"] = overrides
+            report["server_stats"] = server_stats
+            return report
+        finally:
+            if sampler_task is not None:
+                sampler_task.cancel()
+            process.terminate()
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            services.stop()
+            await services_task
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP Server 端到端基准")
+    parser.add_argument("--tool", choices=["search_bing", "search_bing_rewrite", "both"], default="search_bing")
+    parser.add_argument("--requests", type=int, default=100, help="总调用次数")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发客户端数")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--rewrite-num", type=int, default=3)
+    parser.add_argument("--repeat-queries", action="store_true", help="重复使用相同查询，测量缓存命中时的性能")
+    parser.add_argument("--port", type=int, default=9200, help="MCP Server 端口")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="覆盖 MCP Server 配置项，可多次指定，例如 --set BROWSER_WORKERS=4")
+    parser.add_argument("--json", help="将结果保存为 JSON 文件")
+    parser.add_argument("--baseline", help="与之前保存的 JSON 结果对比")
+    fake_services.add_arguments(parser)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n结果已保存到 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
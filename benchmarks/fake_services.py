@@ -0,0 +1,232 @@
+"""基准测试用的本地替身服务：假 Bing、假文章站点群、假 OpenAI 兼容接口
+
+- 假 Bing：/search?q=... 按关键词哈希选取 fixtures 中的搜索结果页，结果链接改写到本地文章站点
+- 文章站点：/a/<原域名>/<原路径>，按配置的延迟和正文长度生成文章，支持静态HTML和需要JS渲染两种页面
+- 假 OpenAI：/v1/chat/completions，按改写提示词返回编号的关键词列表
+
+可单独启动，便于手动调试：
+    python benchmarks/fake_services.py --port 9100
+"""
+import argparse
+import asyncio
+import base64
+import glob
+import hashlib
+import html
+import json
+import os
+import random
+import re
+import sys
+import time
+from urllib.parse import quote
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from serp_parser import decode_bing_link  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+HREF_PATTERN = re.compile(r'href="([^"]+)"')
+
+PARAGRAPH = (
+    "新能源汽车的安全问题一直受到广泛关注，动力电池在过充、挤压、高温等条件下可能发生热失控，"
+    "进而引发起火。研究人员通过大量实验分析了电池单体和模组在不同工况下的温度变化规律，"
+    "并提出了改进热管理系统和电池管理策略的建议。"
+)
+
+
+def encode_bing_link(url: str) -> str:
+    """与 decode_bing_link 相反：把真实URL编码为 Bing 跳转链接的 u 参数"""
+    return "a1" + base64.urlsafe_b64encode(url.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def rewrite_links(page_html: str, farm_base: str) -> str:
+    """把结果页中指向外部站点的链接改写到本地文章站点，Bing 跳转链接中的真实URL同样改写"""
+    def to_farm(url: str) -> str:
+        return f"{farm_base}/a/{url.split('://', 1)[1]}"
+
+    def replace(match: re.Match) -> str:
+        href = html.unescape(match.group(1))
+        target = decode_bing_link(href)
+        if target != href and target.startswith("http"):
+            new_href = re.sub(r"u=a1[A-Za-z0-9_\-]+", "u=" + encode_bing_link(to_farm(target)), href)
+        elif href.startswith("https://") and "bing.com" not in href:
+            new_href = to_farm(href)
+        else:
+            return match.group(0)
+        return f'href="{html.escape(new_href)}"'
+
+    return HREF_PATTERN.sub(replace, page_html)
+
+
+def build_article(title: str, size: int, mode: str) -> str:
+    """生成正文约 size 字的文章页；mode 为 js 时正文由脚本渲染，迫使服务端使用浏览器加载"""
+    paragraphs = []
+    while sum(len(paragraph) for paragraph in paragraphs) < size:
+        paragraphs.append(f"<p>{PARAGRAPH}</p>")
+    body = "".join(paragraphs)
+    if mode == "js":
+        return (
+            f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title></head>"
+            f"<body><div id=\"app\"></div><script>document.getElementById('app').innerHTML = "
+            f"{json.dumps('<article><h1>' + html.escape(title) + '</h1>' + body + '</article>')};</script></body></html>"
+        )
+    return (
+        f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title></head>"
+        f"<body><header><nav><a href=\"/\">首页</a></nav></header>"
+        f"<article><h1>{html.escape(title)}</h1>{body}</article>"
+        f"<footer>版权所有</footer></body></html>"
+    )
+
+
+# 改写关键词的不同角度；每条关键词只保留描述开头的少量字，避免被近似去重合并
+REWRITE_ASPECTS = ["原因分析", "最新数据统计", "专家观点解读", "典型事故案例", "预防措施指南",
+                   "政策法规标准", "技术原理科普", "国内外对比", "保险理赔流程", "用户经验分享"]
+
+
+def rewrite_reply(prompt: str) -> str:
+    """按改写提示词生成编号的关键词列表，格式与真实模型的回复一致，各条关键词互不相似"""
+    match = re.search(r"改写成 (\d+) 条", prompt)
+    count = int(match.group(1)) if match else 5
+    description = prompt.split("需求：", 1)[-1].strip()[:8]
+    return "\n".join(
+        f"{i}. {description} {REWRITE_ASPECTS[(i - 1) % len(REWRITE_ASPECTS)]}" for i in range(1, count + 1)
+    )
+
+
+class FakeServices:
+    """三个替身服务挂在同一个 Starlette 应用上，按路径区分"""
+
+    def __init__(self, port: int, bing_latency: float = 0.05, article_latency: float = 0.2,
+                 article_jitter: float = 0.1, article_size: int = 3000, article_mode: str = "static",
+                 llm_latency: float = 0.3):
+        self.port = port
+        self.base_url = f"http://127.0.0.1:{port}"
+        self.bing_latency = bing_latency
+        self.article_latency = article_latency
+        self.article_jitter = article_jitter
+        self.article_size = article_size
+        self.article_mode = article_mode
+        self.llm_latency = llm_latency
+        self.fixtures = [
+            rewrite_links(open(path, encoding="utf-8").read(), self.base_url)
+            for path in sorted(glob.glob(os.path.join(FIXTURES, "*.html")))
+        ]
+        self.stats = {
+            "serp_requests": 0,
+            "article_requests": 0,
+            "llm_requests": 0,
+        }
+        self.server = None
+
+    def create_app(self):
+        from starlette.applications import Starlette
+        from starlette.responses import HTMLResponse, JSONResponse, Response
+        from starlette.routing import Route
+
+        async def search(request):
+            self.stats["serp_requests"] += 1
+            await asyncio.sleep(self.bing_latency)
+            query = request.query_params.get("q", "")
+            index = int(hashlib.md5(query.encode("utf-8")).hexdigest(), 16) % len(self.fixtures)
+            return HTMLResponse(self.fixtures[index])
+
+        async def article(request):
+            self.stats["article_requests"] += 1
+            path = request.path_params["path"]
+            etag = '"' + hashlib.md5(path.encode("utf-8")).hexdigest() + '"'
+            if request.headers.get("if-none-match") == etag:
+                return Response(status_code=304, headers={"ETag": etag})
+            delay = max(0.0, random.gauss(self.article_latency, self.article_jitter))
+            await asyncio.sleep(delay)
+            return HTMLResponse(build_article(path, self.article_size, self.article_mode), headers={"ETag": etag})
+
+        async def chat_completions(request):
+            self.stats["llm_requests"] += 1
+            payload = await request.json()
+            prompt = payload["messages"][-1]["content"]
+            await asyncio.sleep(self.llm_latency)
+            content = rewrite_reply(prompt) if "改写成" in prompt else "True"
+            return JSONResponse({
+                "id": "chatcmpl-bench",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "bench"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": len(prompt), "completion_tokens": len(content), "total_tokens": len(prompt) + len(content)},
+            })
+
+        async def stats(request):
+            return JSONResponse(self.stats)
+
+        return Starlette(routes=[
+            Route("/search", search),
+            Route("/a/{path:path}", article),
+            Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+            Route("/stats", stats),
+        ])
+
+    async def serve(self):
+        import uvicorn
+
+        self.server = uvicorn.Server(uvicorn.Config(self.create_app(), host="127.0.0.1", port=self.port, log_level="warning"))
+        await self.server.serve()
+
+    async def start(self):
+        """在当前事件循环中后台启动，等待端口可用后返回"""
+        task = asyncio.create_task(self.serve())
+        while self.server is None or not self.server.started:
+            if task.done():
+                task.result()
+            await asyncio.sleep(0.05)
+        return task
+
+    def stop(self):
+        if self.server is not None:
+            self.server.should_exit = True
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--fake-port", type=int, default=9100, help="替身服务端口")
+    parser.add_argument("--bing-latency", type=float, default=0.05, help="假 Bing 响应延迟（秒）")
+    parser.add_argument("--article-latency", type=float, default=0.2, help="文章页平均响应延迟（秒）")
+    parser.add_argument("--article-jitter", type=float, default=0.1, help="文章页延迟标准差（秒）")
+    parser.add_argument("--article-size", type=int, default=3000, help="文章正文字数")
+    parser.add_argument("--article-mode", choices=["static", "js"], default="static",
+                        help="static 走HTTP快速路径，js 需要浏览器渲染")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="假 LLM 响应延迟（秒）")
+
+
+def from_arguments(args: argparse.Namespace) -> FakeServices:
+    return FakeServices(
+        port=args.fake_port,
+        bing_latency=args.bing_latency,
+        article_latency=args.article_latency,
+        article_jitter=args.article_jitter,
+        article_size=args.article_size,
+        article_mode=args.article_mode,
+        llm_latency=args.llm_latency,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动基准测试用的替身服务")
+    add_arguments(parser)
+    parser.add_argument("--port", type=int, help="同 --fake-port")
+    args = parser.parse_args()
+    if args.port:
+        args.fake_port = args.port
+    services = from_arguments(args)
+    print(f"替身服务: {services.base_url}  (Bing: /search, 文章: /a/..., LLM: /v1)")
+    print(f"示例: {services.base_url}/search?q={quote('新能源车自燃原因')}")
+    asyncio.run(services.serve())
+
+
+if __name__ == "__main__":
+    main()
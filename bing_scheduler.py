@@ -0,0 +1,243 @@
+import asyncio
+import heapq
+import itertools
+import sqlite3
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from config import config
+from metrics import metrics
+from shared_cache import SharedSQLite
+
+# 优先级，数值越小越先发出
+PRIORITY_INTERACTIVE = 0  # search_bing 直接调用
+PRIORITY_FANOUT = 1  # search_bing_rewrite 改写关键词的并行搜索
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_FANOUT: "fanout",
+}
+
+
+class BingScheduler(SharedSQLite):
+    """所有发往 Bing 的搜索请求（Playwright 和 HTTP）统一经过这里：令牌桶限速，按优先级排队，
+    检测到限流或验证码后指数退避，退避期间排队等待而不是继续请求
+
+    shared_path 不为空时令牌桶和退避状态保存在SQLite文件中，多 worker 进程共用同一个限速和退避；
+    排队和优先级仍在各进程内
+    """
+
+    def __init__(self, rate: float, burst: int, backoff_base: float, backoff_max: float,
+                 shared_path: Optional[str] = None):
+        super().__init__(shared_path)
+        self.rate = rate  # 每秒发放的令牌数，0 表示不限速（仍然按限流检测结果退避）
+        self.burst = max(1, burst)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.shared_path = shared_path
+        # 跨进程共享时使用墙上时钟，各进程的 monotonic 时钟不可比较
+        self.clock = time.time if shared_path else time.monotonic
+        # 以下状态在共享模式下是最近一次读取的SQLite状态的副本
+        self.tokens = float(self.burst)
+        self.updated_at = self.clock()
+        self.blocked_until = 0.0  # 退避截止时间
+        self.consecutive_throttles = 0
+        self.queue: List[Tuple[int, int, asyncio.Future]] = []
+        self.sequence = itertools.count()
+        self.wakeup: Optional[asyncio.Event] = None
+        self.dispatcher: Optional[asyncio.Task] = None
+        self.prepaid = False  # 调度器已取得令牌但对应的等待者已取消，下一个请求直接使用
+        self.stats = {
+            "dispatched": 0,
+            "queued": 0,
+            "throttled": 0,
+            "total_wait_time": 0.0,
+            "max_wait_time": 0.0,
+            "peak_depth": 0,
+        }
+
+    def _try_take_state(self) -> float:
+        """按当前状态补充令牌并尝试取一个：可以发出时扣除令牌返回0，否则返回还需等待的秒数"""
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + max(0.0, now - self.updated_at) * self.rate)
+        self.updated_at = now
+        wait_tokens = 0.0 if self.rate <= 0 or self.tokens >= 1 else (1 - self.tokens) / self.rate
+        delay = max(wait_tokens, self.blocked_until - now)
+        if delay <= 0 and self.rate > 0:
+            self.tokens -= 1
+        return delay
+
+    def _create_schema(self, conn: sqlite3.Connection):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS bing_scheduler ("
+            "id INTEGER PRIMARY KEY CHECK (id = 1), "
+            "tokens REAL NOT NULL, "
+            "updated_at REAL NOT NULL, "
+            "blocked_until REAL NOT NULL, "
+            "consecutive_throttles INTEGER NOT NULL)"
+        )
+        conn.execute("INSERT OR IGNORE INTO bing_scheduler VALUES (1, ?, ?, 0, 0)", (float(self.burst), time.time()))
+
+    def _update_shared(self, update: Callable[[], float]) -> float:
+        """在SQLite写事务中读取共享状态，调用 update 修改本地副本后写回，返回 update 的结果"""
+        with self.lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.tokens, self.updated_at, self.blocked_until, self.consecutive_throttles = conn.execute(
+                    "SELECT tokens, updated_at, blocked_until, consecutive_throttles FROM bing_scheduler WHERE id = 1"
+                ).fetchone()
+                result = update()
+                conn.execute(
+                    "UPDATE bing_scheduler SET tokens = ?, updated_at = ?, blocked_until = ?, consecutive_throttles = ? "
+                    "WHERE id = 1",
+                    (self.tokens, self.updated_at, self.blocked_until, self.consecutive_throttles)
+                )
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        return result
+
+    async def _apply(self, update: Callable[[], float]) -> float:
+        """执行一次状态更新：共享模式下在SQLite中执行，SQLite不可用时退回到本进程的状态副本"""
+        if self.shared_path:
+            try:
+                return await self._run(self._update_shared, update)
+            except sqlite3.Error as e:
+                print(f"读写共享 Bing 调度状态失败，暂用本进程状态: {e}")
+        return update()
+
+    async def _try_take(self) -> float:
+        delay = await self._apply(self._try_take_state)
+        if delay <= 0:
+            self.stats["dispatched"] += 1
+        return delay
+
+    def depth(self) -> Dict[str, int]:
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, future in self.queue:
+            if not future.done():
+                name = PRIORITY_NAMES.get(priority, str(priority))
+                depth[name] = depth.get(name, 0) + 1
+        return depth
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE):
+        """等待发出一个 Bing 请求的许可；队列为空且有令牌时立即返回"""
+        if not self.queue:
+            if self.prepaid:
+                self.prepaid = False
+                return
+            if await self._try_take() <= 0:
+                return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.queue, (priority, next(self.sequence), future))
+        self.stats["queued"] += 1
+        self.stats["peak_depth"] = max(self.stats["peak_depth"], len(self.queue))
+        self._publish_depth()
+        self._ensure_dispatcher()
+        self.wakeup.set()
+
+        start = time.monotonic()
+        try:
+            await future
+        finally:
+            waited = time.monotonic() - start
+            self.stats["total_wait_time"] += waited
+            self.stats["max_wait_time"] = max(self.stats["max_wait_time"], waited)
+            metrics.observe(f"bing_queue_wait_{PRIORITY_NAMES.get(priority, priority)}", waited)
+            self._publish_depth()
+
+    def _ensure_dispatcher(self):
+        if self.wakeup is None:
+            self.wakeup = asyncio.Event()
+        if self.dispatcher is None or self.dispatcher.done():
+            self.dispatcher = asyncio.create_task(self._dispatch())
+
+    async def _dispatch(self):
+        while True:
+            # 丢弃已取消（例如超过时间预算）的等待者
+            while self.queue and self.queue[0][2].done():
+                heapq.heappop(self.queue)
+            if not self.queue:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            if not self.prepaid:
+                delay = await self._try_take()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+                self.prepaid = True
+
+            _, _, future = heapq.heappop(self.queue)
+            if future.done():
+                # 取得令牌期间等待者已取消，令牌留给下一个等待者
+                continue
+            self.prepaid = False
+            future.set_result(None)
+
+    def _throttle_state(self) -> float:
+        self.consecutive_throttles += 1
+        backoff = min(self.backoff_max, self.backoff_base * 2 ** (self.consecutive_throttles - 1))
+        self.blocked_until = max(self.blocked_until, self.clock() + backoff)
+        return backoff
+
+    async def report_throttled(self, reason: str):
+        """检测到限流或验证码：按连续次数指数退避，退避期间所有 Bing 请求排队等待（共享模式下包括其他进程）"""
+        backoff = await self._apply(self._throttle_state)
+        self.stats["throttled"] += 1
+        print(f"检测到 Bing 限流（{reason}），暂停请求 {backoff:.1f} 秒")
+
+    def _reset_state(self) -> float:
+        self.consecutive_throttles = 0
+        return 0.0
+
+    async def report_ok(self):
+        """请求正常时清零连续限流次数；共享模式下只在本进程最近看到过限流时写入"""
+        if self.consecutive_throttles:
+            await self._apply(self._reset_state)
+
+    def _publish_depth(self):
+        for name, value in self.depth().items():
+            metrics.set_gauge("bing_queue_depth", value, priority=name)
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats["depth"] = self.depth()
+        stats["tokens"] = self.tokens
+        stats["backoff_remaining"] = max(0.0, self.blocked_until - self.clock())
+        stats["shared"] = bool(self.shared_path)
+        stats["consecutive_throttles"] = self.consecutive_throttles
+        stats["avg_wait_time"] = stats["total_wait_time"] / stats["queued"] if stats["queued"] else 0.0
+        return stats
+
+
+def is_throttled(status_code: Optional[int], url: str, page_html: str) -> Optional[str]:
+    """根据状态码、最终URL和页面内容判断是否被 Bing 限流或要求验证，返回原因"""
+    if status_code in (403, 429, 503):
+        return f"HTTP {status_code}"
+    haystack = url.lower() + "\n" + page_html[:20000].lower()
+    for signature in config.BING_THROTTLE_SIGNATURES:
+        if signature.lower() in haystack:
+            return signature
+    return None
+
+
+def _shared_path() -> Optional[str]:
+    """多 worker 模式下默认跨进程共享限速和退避状态，与共享SERP缓存使用同一个SQLite文件"""
+    shared = config.BING_SCHEDULER_SHARED
+    if shared is None:
+        shared = config.MCP_WORKERS > 1
+    return config.SERP_SHARED_CACHE_PATH if shared else None
+
+
+# 创建全局实例
+bing_scheduler = BingScheduler(
+    rate=config.BING_RATE_LIMIT,
+    burst=config.BING_BURST,
+    backoff_base=config.BING_BACKOFF_BASE,
+    backoff_max=config.BING_BACKOFF_MAX,
+    shared_path=_shared_path()
+)
@@ -0,0 +1,328 @@
+import asyncio
+import math
+import os
+import time
+from typing import Callable, Dict, List, Optional
+from playwright.async_api import Browser, BrowserContext, Page, Playwright
+from config import config
+from page_pool import PagePool, PagePoolClosed
+from resource_blocker import ResourceBlocker
+
+try:
+    import psutil
+except ImportError:  # 可选依赖，缺失时不按内存回收浏览器
+    psutil = None
+
+
+BROWSER_ARGS = [
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-features=NetworkService",
+    "--disable-features=VizDisplayCompositor",
+    "--disable-dev-shm-usage",
+    "--no-sandbox"
+]
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+
+class BrowserUnavailable(Exception):
+    """页面所在的浏览器 worker 已崩溃或被关闭，与正在访问的站点无关"""
+
+
+class BrowserWorker:
+    """一个浏览器进程及其独立的上下文和页面池"""
+
+    def __init__(self, worker_id: int, generation: int, max_pages: int, resource_blocker: Optional[ResourceBlocker],
+                 on_crash: Callable[["BrowserWorker"], None]):
+        self.worker_id = worker_id
+        self.generation = generation
+        self.max_pages = max_pages
+        self.resource_blocker = resource_blocker
+        self.on_crash = on_crash
+        # 通过命令行标记在进程列表中找到本浏览器的主进程，Chromium 会忽略未知的开关
+        self.marker = f"--bing-search-mcp-worker={os.getpid()}-{worker_id}-{generation}"
+        self.browser: Optional[Browser] = None
+        self.context: Optional[BrowserContext] = None
+        self.page_pool: Optional[PagePool] = None
+        self.navigations = 0
+        self.healthy = True
+        self.retiring = False  # 等待在用页面归还后关闭
+        self.started_at = 0.0
+
+    async def start(self, playwright: Playwright):
+        self.browser = await playwright.chromium.launch(headless=True, args=BROWSER_ARGS + [self.marker])
+        self.browser.on("disconnected", lambda _: self._on_disconnected())
+        self.context = await self.browser.new_context(
+            viewport={"width": 1920, "height": 1080},
+            user_agent=USER_AGENT
+        )
+        if self.resource_blocker is not None:
+            await self.resource_blocker.install(self.context)
+        self.page_pool = PagePool(self.context.new_page, self.max_pages)
+        self.started_at = time.monotonic()
+
+    def _on_disconnected(self):
+        if not self.healthy:
+            return
+        self.healthy = False
+        if not self.retiring:
+            print(f"浏览器 worker {self.worker_id} 已断开，准备替换")
+            self.on_crash(self)
+
+    @property
+    def available(self) -> bool:
+        return self.healthy and not self.retiring and self.page_pool is not None and not self.page_pool.closed
+
+    @property
+    def load(self) -> float:
+        """负载比例，替换期间让给旧 worker 的名额也计入负载"""
+        if self.page_pool is None:
+            return math.inf
+        return (self.page_pool.load + self.max_pages - self.page_pool.max_size) / self.max_pages
+
+    @property
+    def idle(self) -> bool:
+        return self.page_pool is None or not self.page_pool.active_pages
+
+    def rss_mb(self) -> Optional[float]:
+        """浏览器主进程及其所有子进程（渲染进程等）的常驻内存，单位MB；未安装 psutil 时返回 None"""
+        if psutil is None:
+            return None
+        try:
+            for process in psutil.Process().children(recursive=True):
+                try:
+                    if self.marker not in process.cmdline():
+                        continue
+                    processes = [process] + process.children(recursive=True)
+                    return sum(child.memory_info().rss for child in processes) / 1024 / 1024
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+        except psutil.Error:
+            return None
+        return None
+
+    def is_connected(self) -> bool:
+        return self.browser is not None and self.browser.is_connected()
+
+    async def close(self):
+        if self.page_pool is not None:
+            await self.page_pool.close()
+        try:
+            if self.context is not None:
+                await self.context.close()
+            if self.browser is not None:
+                await self.browser.close()
+        except Exception as e:
+            print(f"关闭浏览器 worker {self.worker_id} 失败: {e}")
+
+    def get_stats(self) -> Dict:
+        return {
+            "worker_id": self.worker_id,
+            "generation": self.generation,
+            "healthy": self.healthy,
+            "retiring": self.retiring,
+            "navigations": self.navigations,
+            "uptime": time.monotonic() - self.started_at if self.started_at else 0.0,
+            "rss_mb": self.rss_mb(),
+            "page_pool": self.page_pool.get_stats() if self.page_pool else None,
+        }
+
+
+class BrowserPool:
+    """N 个浏览器 worker 组成的池：按负载分配页面，按导航次数或内存回收 worker，崩溃后自动替换"""
+
+    def __init__(self, size: int, max_pages: int, resource_blocker: Optional[ResourceBlocker]):
+        max_pages = max(1, max_pages)
+        if size > max_pages:
+            print(f"BROWSER_WORKERS ({size}) 大于 MAX_PAGES ({max_pages})，按 {max_pages} 个 worker 启动")
+        # 每个 worker 至少一个页面，worker 数不超过 MAX_PAGES
+        self.size = min(max(1, size), max_pages)
+        self.max_pages = max_pages
+        self.resource_blocker = resource_blocker
+        self.playwright: Optional[Playwright] = None
+        self.workers: List[BrowserWorker] = []
+        self.retired: List[BrowserWorker] = []  # 已被替换、等待在用页面归还后关闭的 worker
+        self.page_owners: Dict[Page, BrowserWorker] = {}
+        self.generations = 0
+        self.health_task: Optional[asyncio.Task] = None
+        self.replacing: Dict[int, asyncio.Task] = {}
+        self.workers_changed = asyncio.Event()  # 有 worker 替换完成时通知等待中的调用方
+        self.closing = False  # 关闭期间浏览器断开是预期行为，不再替换
+        self.stats = {
+            "recycled": 0,
+            "crashed": 0,
+            "rerouted": 0,
+        }
+
+    async def start(self, playwright: Playwright):
+        self.playwright = playwright
+        self.workers = await asyncio.gather(*(self._launch(worker_id) for worker_id in range(self.size)))
+        self.health_task = asyncio.create_task(self._health_loop())
+
+    async def _launch(self, worker_id: int) -> BrowserWorker:
+        self.generations += 1
+        worker = BrowserWorker(worker_id, self.generations, self._pages_for(worker_id), self.resource_blocker,
+                               on_crash=lambda crashed: self._replace(crashed, crashed=True))
+        await worker.start(self.playwright)
+        return worker
+
+    def _pages_for(self, worker_id: int) -> int:
+        """MAX_PAGES 为所有 worker 的页面总数：平分后余数分给前几个 worker"""
+        pages, remainder = divmod(self.max_pages, self.size)
+        return pages + (1 if worker_id < remainder else 0)
+
+    async def acquire(self, timeout: Optional[float] = None) -> Page:
+        """从负载最低的可用 worker 获取页面；所在 worker 被关闭时换一个 worker 重试"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            worker = await self._pick_worker(deadline)
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                page = await worker.page_pool.acquire(timeout=remaining)
+            except PagePoolClosed:
+                self.stats["rerouted"] += 1
+                continue
+            if not worker.available:
+                # 等待期间 worker 被回收或崩溃，归还页面后换一个 worker
+                await self._return_page(worker, page)
+                self.stats["rerouted"] += 1
+                continue
+            worker.navigations += 1
+            self.page_owners[page] = worker
+            return page
+
+    async def _pick_worker(self, deadline: Optional[float]) -> BrowserWorker:
+        while True:
+            candidates = [worker for worker in self.workers if worker.available]
+            if candidates:
+                return min(candidates, key=lambda worker: worker.load)
+            # 所有 worker 都在替换中，等待替换完成
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise asyncio.TimeoutError("没有可用的浏览器 worker")
+            self.workers_changed.clear()
+            await asyncio.wait_for(self.workers_changed.wait(), remaining)
+
+    def page_healthy(self, page: Page) -> bool:
+        """页面所在的 worker 是否仍然正常，用于区分浏览器崩溃和目标站点的加载失败"""
+        worker = self.page_owners.get(page)
+        return worker is not None and worker.healthy and worker.is_connected()
+
+    async def release(self, page: Page, reset):
+        worker = self.page_owners.pop(page, None)
+        if worker is None:
+            return
+        await self._return_page(worker, page, reset)
+        # 导航次数在归还时检查，内存占用由健康检查定期检查
+        if worker.available and self._should_recycle(worker, check_rss=False):
+            self._replace(worker, crashed=False)
+        await self._close_drained()
+
+    async def _return_page(self, worker: BrowserWorker, page: Page, reset=None):
+        if worker.healthy and worker.page_pool and not worker.page_pool.closed:
+            await worker.page_pool.release(page, reset=reset if worker.available else None)
+        elif worker.page_pool:
+            await worker.page_pool.discard(page)
+
+    def _should_recycle(self, worker: BrowserWorker, check_rss: bool = True) -> bool:
+        if config.BROWSER_RECYCLE_NAVIGATIONS and worker.navigations >= config.BROWSER_RECYCLE_NAVIGATIONS:
+            return True
+        if check_rss and config.BROWSER_RECYCLE_RSS_MB:
+            rss = worker.rss_mb()
+            if rss is not None and rss >= config.BROWSER_RECYCLE_RSS_MB:
+                print(f"浏览器 worker {worker.worker_id} 内存 {rss:.0f}MB 超过阈值，准备回收")
+                return True
+        return False
+
+    def _replace(self, worker: BrowserWorker, crashed: bool):
+        """启动新 worker 替换旧 worker；旧 worker 不再分配页面，在用页面归还后关闭"""
+        if self.closing or worker.worker_id in self.replacing:
+            return
+        worker.retiring = True
+        self.stats["crashed" if crashed else "recycled"] += 1
+        self.replacing[worker.worker_id] = asyncio.create_task(self._do_replace(worker))
+
+    async def _do_replace(self, worker: BrowserWorker):
+        try:
+            # 崩溃的 worker 上排队的调用方会收到 PagePoolClosed 并改用其他 worker
+            if not worker.healthy:
+                await worker.page_pool.close()
+            while True:
+                try:
+                    new_worker = await self._launch(worker.worker_id)
+                    break
+                except Exception as e:
+                    print(f"启动浏览器 worker {worker.worker_id} 失败，稍后重试: {e}")
+                    await asyncio.sleep(1)
+            if self.closing or worker not in self.workers:
+                await new_worker.close()
+                return
+            self.workers[self.workers.index(worker)] = new_worker
+            self.retired.append(worker)
+            self._sync_capacity()
+            self.workers_changed.set()
+            await self._close_drained()
+        finally:
+            self.replacing.pop(worker.worker_id, None)
+
+    async def _close_drained(self):
+        for worker in list(self.retired):
+            if worker.idle or not worker.healthy:
+                self.retired.remove(worker)
+                # 丢弃已分配但尚未归还的页面，归还时直接忽略
+                for page, owner in list(self.page_owners.items()):
+                    if owner is worker:
+                        self.page_owners.pop(page, None)
+                await worker.close()
+        self._sync_capacity()
+
+    def _sync_capacity(self):
+        """旧 worker 仍在使用的页面占用同一份配额，新 worker 的容量随旧页面归还逐步恢复，页面总数不超过 MAX_PAGES"""
+        for worker in self.workers:
+            if worker.page_pool is None:
+                continue
+            reserved = sum(old.page_pool.in_use for old in self.retired
+                           if old.worker_id == worker.worker_id and old.page_pool and not old.page_pool.closed)
+            worker.page_pool.set_max_size(max(0, worker.max_pages - reserved))
+
+    async def _health_loop(self):
+        """定期检查浏览器连接和内存，替换崩溃或超出内存阈值的 worker"""
+        while True:
+            await asyncio.sleep(config.BROWSER_HEALTH_INTERVAL)
+            try:
+                for worker in list(self.workers):
+                    if not worker.is_connected():
+                        worker.healthy = False
+                    if not worker.healthy:
+                        self._replace(worker, crashed=True)
+                    elif worker.available and self._should_recycle(worker):
+                        self._replace(worker, crashed=False)
+                await self._close_drained()
+            except Exception as e:
+                print(f"浏览器健康检查失败: {e}")
+
+    async def close(self):
+        self.closing = True
+        if self.health_task is not None:
+            self.health_task.cancel()
+        for worker in self.workers + self.retired:
+            worker.retiring = True
+        for worker in self.workers + self.retired:
+            await worker.close()
+        replacing = list(self.replacing.values())
+        for task in replacing:
+            task.cancel()
+        await asyncio.gather(*replacing, return_exceptions=True)
+        self.workers = []
+        self.retired = []
+        self.page_owners.clear()
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats["size"] = self.size
+        stats["max_pages"] = self.max_pages
+        stats["pages_per_worker"] = [worker.max_pages for worker in self.workers]
+        stats["workers"] = [worker.get_stats() for worker in self.workers]
+        stats["retiring"] = len(self.retired)
+        return stats
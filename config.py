@@ -9,6 +9,8 @@ class Config:
             "LLM_BASE_URL": "http://192.168.3.153:11434/v1",
             "LLM_MODEL": "qwen3:14b",
             "MCP_PORT": 8903,
+            "MCP_WORKERS": 1,  # MCP Server 进程数，大于1时每个进程拥有独立的浏览器资源
+            "MCP_STREAMING": False,  # 以SSE响应工具调用，流式工具的进度和结果通知可以实时推送
             "MAX_RETRY": 3,
             "TOP_K": 5,
             "MAX_TOKEN": 150,
@@ -16,7 +18,119 @@ class Config:
             "MAX_ITER": 3,     # 最大迭代次数
             "BING_URL": "https://cn.bing.com",
             "HEADLESS": True,  # 无头浏览器模式
-            "MAX_PAGES": 5     # 最大页面数量，控制Chrome进程数量
+            "MAX_PAGES": 5,    # 所有浏览器 worker 的最大页面总数，worker 替换期间旧 worker 的在用页面也计入该总数
+            "PAGE_ACQUIRE_TIMEOUT": 60,  # 等待页面池空闲页面的超时时间（秒）
+            "RRF_K": 60,       # 多关键词结果倒数排名融合(RRF)的平滑常数
+            "LLM_CONCURRENCY": 4,  # 同时进行的异步LLM调用数量上限，同时也是连接池大小
+            "LLM_TIMEOUT": 60,     # 单次LLM调用超时时间（秒）
+            "REWRITE_CACHE_TTL": 3600,  # 关键词改写结果缓存有效期（秒），0表示关闭缓存
+            "REWRITE_CACHE_MAX_ENTRIES": 1000,  # 关键词改写结果缓存最大条目数
+            "REWRITE_DEDUP_THRESHOLD": 0.6,  # 改写关键词字符n-gram Jaccard相似度达到该值视为重复，只保留一个
+            "REWRITE_DEDUP_NGRAM": 2,  # 计算相似度使用的字符n-gram长度
+            "SERP_CACHE_TTL": 600,  # SERP结果缓存有效期（秒），0表示关闭缓存
+            "SERP_CACHE_MAX_ENTRIES": 1000,  # SERP结果缓存最大条目数
+            "SERP_CACHE_MAX_BYTES": 16 * 1024 * 1024,  # SERP结果缓存估算内存上限（字节）
+            "CONTENT_STORE_PATH": "content_store.db",  # 正文持久化存储SQLite文件路径，为空表示关闭
+            "CONTENT_STORE_TTL": 86400,  # 正文有效期（秒），过期后通过ETag/Last-Modified重新验证
+            "CONTENT_STORE_MAX_ENTRIES": 100000,  # 正文持久化存储最大条目数
+            "HTTP_FAST_PATH": True,  # 先用HTTP直接获取静态HTML提取正文，不足时再用浏览器
+            "HTTP_FAST_PATH_MIN_TEXT": 200,  # 静态HTML正文至少多少字才认为足够
+            "HTTP_FAST_PATH_MAX_BYTES": 5 * 1024 * 1024,  # HTTP快速路径最多下载的HTML字节数，超过时改用浏览器
+            # 出现这些特征说明页面依赖JS渲染，需要改用浏览器
+            "JS_SHELL_SIGNATURES": [
+                '<div id="root"></div>',
+                '<div id="app"></div>',
+                '<div id="__next"></div>',
+                "please enable javascript",
+                "enable javascript to run this app",
+                "请启用javascript",
+                "请开启javascript"
+            ],
+            "BLOCK_RESOURCES": True,  # 浏览器中拦截不需要的资源请求
+            "BLOCK_RESOURCE_TYPES": ["image", "font", "media", "stylesheet"],  # 拦截的资源类型
+            # 拦截的广告/统计域名（包含子域名）
+            "BLOCK_HOSTS": [
+                "doubleclick.net",
+                "googlesyndication.com",
+                "googleadservices.com",
+                "google-analytics.com",
+                "googletagmanager.com",
+                "adservice.google.com",
+                "facebook.net",
+                "scorecardresearch.com",
+                "hm.baidu.com",
+                "pos.baidu.com",
+                "cpro.baidu.com",
+                "cnzz.com",
+                "mediav.com"
+            ],
+            # 各资源类型的典型大小（字节），用于估算被拦截的流量
+            "BLOCK_BYTES_ESTIMATE": {
+                "image": 30 * 1024,
+                "font": 40 * 1024,
+                "media": 500 * 1024,
+                "stylesheet": 20 * 1024,
+                "script": 30 * 1024
+            },
+            "READY_STABLE_INTERVAL": 200,  # 文章正文稳定检测的轮询间隔（毫秒）
+            "READY_STABLE_ROUNDS": 2,  # 正文长度连续多少次不变视为稳定
+            "READY_MAX_WAIT": 3000,  # 正文稳定检测最长等待时间（毫秒），超过后直接提取
+            "HTTP_CONCURRENCY": 20,  # 共享HTTP客户端同时进行的请求数量上限
+            "HTTP_MAX_CONNECTIONS": 50,  # 共享HTTP客户端连接池最大连接数
+            "HTTP_MAX_KEEPALIVE": 20,  # 共享HTTP客户端保持的keep-alive连接数
+            "HTTP2": False,  # 启用HTTP/2，需要安装 h2（pip install httpx[http2]）
+            "DEBUG_CAPTURE": False,  # 采集SERP页面HTML用于排查解析问题，默认关闭
+            "DEBUG_CAPTURE_SAMPLE_RATE": 0.01,  # 采样率（0~1）
+            "DEBUG_CAPTURE_QUERY_PATTERN": None,  # 只采集匹配该正则的查询
+            "DEBUG_CAPTURE_URL_PATTERN": None,  # 只采集匹配该正则的URL
+            "DEBUG_CAPTURE_MAX_ENTRIES": 50,  # 内存中保留的最近采集数量
+            "DEBUG_CAPTURE_DIR": "debug_captures",  # POST /debug/captures/dump 写出采集的目录
+            "EXTRACT_WORKERS": None,  # 每个服务进程的正文提取进程数，None表示CPU核数除以 MCP_WORKERS，0表示在主进程中执行
+            "EXTRACT_QUEUE_SIZE": 32,  # 正文提取进程池排队上限，超出时调用方等待
+            # 正文质量过滤规则及权重，正文中每千字的加权命中得分达到阈值即判定为广告/登录页
+            "CONTENT_FILTER_RULES": {
+                "广告": 1.0,
+                "推广": 1.0,
+                "advertisement": 1.0,
+                "sponsored": 1.0,
+                "promoted": 0.5,
+                "点击下载": 1.5,
+                "立即购买": 1.5,
+                "扫码关注": 1.0,
+                "注册": 0.5,
+                "登录": 0.5,
+                "请先登录": 5.0,
+                "登录后查看": 5.0
+            },
+            "CONTENT_FILTER_THRESHOLD": 5.0,
+            "BROWSER_WORKERS": 2,  # 浏览器 worker 数量，每个 worker 一个Chromium进程（替换期间新旧进程短暂并存），MAX_PAGES 在 worker 间分配，不超过 MAX_PAGES
+            "BROWSER_RECYCLE_NAVIGATIONS": 500,  # worker 累计导航次数达到该值后回收重启，0表示不按次数回收
+            "BROWSER_RECYCLE_RSS_MB": 1500,  # worker 内存（含渲染进程）超过该值后回收重启，需要 psutil，0表示关闭
+            "BROWSER_HEALTH_INTERVAL": 30,  # 浏览器健康检查间隔（秒）
+            "DOMAIN_LATENCY_WINDOW": 50,  # 每个域名保留最近多少次成功加载的耗时
+            "DOMAIN_MIN_SAMPLES": 5,  # 样本数达到后才使用自适应超时
+            "DOMAIN_TIMEOUT_PERCENTILE": 0.95,  # 自适应超时基于的耗时分位数
+            "DOMAIN_TIMEOUT_MULTIPLIER": 3.0,  # 自适应超时 = 分位数耗时 × 系数，不超过默认超时
+            "DOMAIN_MIN_TIMEOUT": 5,  # 自适应超时下限（秒）
+            "DOMAIN_FAILURE_THRESHOLD": 3,  # 域名连续失败多少次后熔断，0表示关闭熔断
+            "DOMAIN_COOLDOWN": 300,  # 熔断冷却时间（秒），之后放行一次试探请求
+            "DOMAIN_MAX_ENTRIES": 10000,  # 最多记录的域名数
+            "BING_RATE_LIMIT": 2.0,  # 发往Bing的搜索请求每秒令牌数，0表示不限速
+            "BING_BURST": 5,  # 令牌桶容量，允许的突发请求数
+            "BING_BACKOFF_BASE": 5,  # 检测到限流后的首次退避时间（秒），连续限流时翻倍
+            "BING_BACKOFF_MAX": 300,  # 最长退避时间（秒）
+            "BING_SCHEDULER_SHARED": None,  # 跨进程共享限速和退避状态，保存在 SERP_SHARED_CACHE_PATH，None表示 MCP_WORKERS 大于1时自动开启
+            # 最终URL或页面中出现这些特征说明被Bing限流或要求验证
+            "BING_THROTTLE_SIGNATURES": [
+                "/challenge",
+                "captcha",
+                "b_captcha",
+                "unusual traffic",
+                "异常流量",
+                "请完成验证"
+            ],
+            "SERP_SHARED_CACHE": None,  # 跨进程共享SERP缓存，None表示 MCP_WORKERS 大于1时自动开启
+            "SERP_SHARED_CACHE_PATH": "serp_cache.db"  # 共享SERP缓存SQLite文件路径
         }
         
         # 加载本地配置文件
@@ -41,6 +155,7 @@ class Config:
             "LLM_BASE_URL": "BING_SEARCH_LLM_BASE_URL",
             "LLM_MODEL": "BING_SEARCH_LLM_MODEL",
             "MCP_PORT": "BING_SEARCH_MCP_PORT",
+            "MCP_WORKERS": "BING_SEARCH_MCP_WORKERS",
             "MAX_RETRY": "BING_SEARCH_MAX_RETRY",
             "TOP_K": "BING_SEARCH_TOP_K",
             "MAX_TOKEN": "BING_SEARCH_MAX_TOKEN"
@@ -50,7 +165,7 @@ class Config:
             env_value = os.environ.get(env_key)
             if env_value is not None:
                 # 根据配置类型转换值
-                if config_key in ["MCP_PORT", "MAX_RETRY", "TOP_K", "MAX_TOKEN"]:
+                if config_key in ["MCP_PORT", "MCP_WORKERS", "MAX_RETRY", "TOP_K", "MAX_TOKEN"]:
                     try:
                         self.config[config_key] = int(env_value)
                     except ValueError:
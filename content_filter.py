@@ -0,0 +1,55 @@
+import re
+from typing import Dict, Tuple
+
+
+class ContentFilter:
+    """正文质量过滤：所有规则编译成一个正则，一次扫描统计各规则命中次数，按加权得分判断是否为广告/登录页
+
+    得分按每千字计算，长文中偶尔出现一次“广告”不会被判定为广告页
+    """
+
+    def __init__(self, rules: Dict[str, float], threshold: float):
+        self.rules = dict(rules)
+        self.threshold = threshold
+        self.weights = {pattern.lower(): weight for pattern, weight in self.rules.items()}
+        # 长的模式优先匹配，避免被其前缀抢先匹配
+        patterns = sorted(self.weights, key=len, reverse=True)
+        self.pattern = re.compile("|".join(re.escape(pattern) for pattern in patterns), re.IGNORECASE) if patterns else None
+        self.stats = {
+            "checked": 0,
+            "rejected": 0,
+            "rule_hits": {},
+        }
+
+    def scan(self, text: str) -> Dict[str, int]:
+        """单次扫描，返回各规则的命中次数"""
+        hits: Dict[str, int] = {}
+        if self.pattern is None:
+            return hits
+        for match in self.pattern.finditer(text):
+            rule = match.group(0).lower()
+            hits[rule] = hits.get(rule, 0) + 1
+        return hits
+
+    def score(self, text: str, hits: Dict[str, int]) -> float:
+        total = sum(self.weights.get(rule, 0.0) * count for rule, count in hits.items())
+        return total / max(1.0, len(text) / 1000)
+
+    def check(self, text: str) -> Tuple[bool, Dict[str, int]]:
+        """返回 (是否拒绝, 各规则命中次数)"""
+        hits = self.scan(text)
+        return self.score(text, hits) >= self.threshold, hits
+
+    def record(self, rejected: bool, hits: Dict[str, int]):
+        """汇总命中统计；检查可能在工作进程中完成，结果在主进程中汇总"""
+        self.stats["checked"] += 1
+        if rejected:
+            self.stats["rejected"] += 1
+        rule_hits = self.stats["rule_hits"]
+        for rule, count in hits.items():
+            rule_hits[rule] = rule_hits.get(rule, 0) + count
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats["rule_hits"] = dict(self.stats["rule_hits"])
+        return stats
@@ -0,0 +1,116 @@
+import sqlite3
+import time
+import zlib
+from typing import Dict, Optional
+from shared_cache import SharedSQLite
+
+
+class StoredContent:
+    def __init__(self, url: str, content: str, etag: Optional[str], last_modified: Optional[str],
+                 fetched_at: float, fresh: bool):
+        self.url = url
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self.fresh = fresh  # 是否仍在有效期内，过期后需要重新验证
+
+    @property
+    def revalidatable(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """构造条件请求头，用于 ETag/Last-Modified 重新验证"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ContentStore(SharedSQLite):
+    """基于 SQLite 的正文持久化存储，按 URL 保存压缩后的正文，重启后仍然有效；
+    WAL模式，多 worker 进程可以同时读写同一个存储
+    """
+
+    def __init__(self, path: str, ttl: float, max_entries: int):
+        super().__init__(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "stale": 0,
+            "revalidated": 0,
+            "stored": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _create_schema(self, conn: sqlite3.Connection):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS contents ("
+            "url TEXT PRIMARY KEY, "
+            "content BLOB NOT NULL, "
+            "etag TEXT, "
+            "last_modified TEXT, "
+            "fetched_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_contents_fetched_at ON contents (fetched_at)")
+
+    def _prune(self, conn: sqlite3.Connection):
+        # 清理最旧的条目，控制数据库大小
+        conn.execute(
+            "DELETE FROM contents WHERE url IN ("
+            "SELECT url FROM contents ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def get(self, url: str) -> Optional[StoredContent]:
+        with self.lock:
+            row = self._connect().execute(
+                "SELECT content, etag, last_modified, fetched_at FROM contents WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+
+        content, etag, last_modified, fetched_at = row
+        fresh = time.time() - fetched_at < self.ttl
+        self.stats["hits" if fresh else "stale"] += 1
+        return StoredContent(url, zlib.decompress(content).decode("utf-8"), etag, last_modified, fetched_at, fresh)
+
+    def put(self, url: str, content: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        blob = zlib.compress(content.encode("utf-8"), 6)
+        with self.lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO contents (url, content, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (url, blob, etag, last_modified, time.time())
+            )
+            self._count_write(conn)
+            conn.commit()
+        self.stats["stored"] += 1
+
+    def touch(self, url: str):
+        """重新验证通过（304），刷新获取时间"""
+        with self.lock:
+            conn = self._connect()
+            conn.execute("UPDATE contents SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            conn.commit()
+        self.stats["revalidated"] += 1
+
+    async def aget(self, url: str) -> Optional[StoredContent]:
+        return await self._run(self.get, url)
+
+    async def aput(self, url: str, content: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        await self._run(self.put, url, content, etag, last_modified)
+
+    async def atouch(self, url: str):
+        await self._run(self.touch, url)
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats)
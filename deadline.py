@@ -0,0 +1,26 @@
+import asyncio
+import time
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Deadline:
+    """单次调用的时间预算；timeout 为 None 表示不限时"""
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self.expires_at = None if timeout is None else time.monotonic() + max(0.0, timeout)
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    async def run(self, awaitable: Awaitable[T]) -> T:
+        """在剩余时间内等待，超时抛出 asyncio.TimeoutError 并取消被等待的操作"""
+        return await asyncio.wait_for(awaitable, self.remaining())
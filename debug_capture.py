@@ -0,0 +1,94 @@
+import os
+import random
+import re
+import time
+import zlib
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from config import config
+
+
+class DebugCapture:
+    """调试页面采集：默认关闭，按采样率和查询/URL过滤条件把页面HTML压缩后保存在有界环形缓冲区中"""
+
+    def __init__(self, enabled: bool, sample_rate: float, query_pattern: Optional[str],
+                 url_pattern: Optional[str], max_entries: int):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.query_pattern = re.compile(query_pattern) if query_pattern else None
+        self.url_pattern = re.compile(url_pattern) if url_pattern else None
+        self.entries: Deque[Dict] = deque(maxlen=max_entries)
+        self.next_id = 0  # 采集编号持续递增，旧采集被淘汰后编号不变
+        self.stats = {
+            "seen": 0,
+            "captured": 0,
+            "filtered": 0,
+        }
+
+    def should_capture(self, query: str = "", url: str = "") -> bool:
+        """是否采集本次页面；调用方可以先判断，避免为获取HTML产生额外开销"""
+        if not self.enabled:
+            return False
+        self.stats["seen"] += 1
+        if self.query_pattern and not self.query_pattern.search(query):
+            self.stats["filtered"] += 1
+            return False
+        if self.url_pattern and not self.url_pattern.search(url):
+            self.stats["filtered"] += 1
+            return False
+        return random.random() < self.sample_rate
+
+    def capture(self, kind: str, html: str, query: str = "", url: str = "", checked: bool = False) -> bool:
+        """保存一次页面采集，checked 表示调用方已经通过 should_capture 判断过"""
+        if not checked and not self.should_capture(query, url):
+            return False
+        data = zlib.compress(html.encode("utf-8"), 6)
+        self.next_id += 1
+        self.entries.append({
+            "id": self.next_id,
+            "time": time.time(),
+            "kind": kind,
+            "query": query,
+            "url": url,
+            "size": len(html),
+            "compressed_size": len(data),
+            "data": data,
+        })
+        self.stats["captured"] += 1
+        return True
+
+    def list_entries(self) -> List[Dict]:
+        return [{key: value for key, value in entry.items() if key != "data"} for entry in self.entries]
+
+    def get_html(self, entry_id: int) -> Optional[str]:
+        """按采集编号取出页面HTML，已被淘汰或不存在时返回 None"""
+        for entry in self.entries:
+            if entry["id"] == entry_id:
+                return zlib.decompress(entry["data"]).decode("utf-8")
+        return None
+
+    def dump(self, directory: str) -> List[str]:
+        """把缓冲区中的采集写到目录中，用于离线排查解析问题"""
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for entry in list(self.entries):
+            path = os.path.join(directory, f"{int(entry['time'] * 1000)}_{entry['id']}_{entry['kind']}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(zlib.decompress(entry["data"]).decode("utf-8"))
+            paths.append(path)
+        return paths
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats["buffered"] = len(self.entries)
+        stats["buffered_bytes"] = sum(entry["compressed_size"] for entry in self.entries)
+        return stats
+
+
+debug_capture = DebugCapture(
+    enabled=config.DEBUG_CAPTURE,
+    sample_rate=config.DEBUG_CAPTURE_SAMPLE_RATE,
+    query_pattern=config.DEBUG_CAPTURE_QUERY_PATTERN,
+    url_pattern=config.DEBUG_CAPTURE_URL_PATTERN,
+    max_entries=config.DEBUG_CAPTURE_MAX_ENTRIES
+)
@@ -0,0 +1,148 @@
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+
+LOAD_PATHS = ("http", "browser")
+
+
+class DomainState:
+    def __init__(self, domain: str, window: int):
+        self.domain = domain
+        # 按加载路径（http 快速路径、browser 浏览器导航）分别记录最近成功加载的耗时（秒），两者量级不同
+        self.latencies: Dict[str, Deque[float]] = {path: deque(maxlen=window) for path in LOAD_PATHS}
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0  # 熔断截止时间，0表示未熔断
+        self.probing = False  # 冷却期结束后已放行试探请求，等待其结果
+        self.trips = 0
+        self.skipped = 0
+        self.last_error: Optional[str] = None
+
+
+class DomainHealth:
+    """按域名记录加载耗时和失败历史：根据耗时分位数给出自适应超时，连续失败的域名熔断一段时间
+
+    熔断期间直接跳过该域名；冷却期结束后放行一次试探请求（只尝试一次），成功则恢复，失败则重新熔断；
+    试探请求没有结果（例如被取消）时，再过一个冷却期放行下一次试探
+    """
+
+    def __init__(self, window: int, min_samples: int, percentile: float, multiplier: float,
+                 min_timeout: float, failure_threshold: int, cooldown: float, max_domains: int):
+        self.window = window
+        self.min_samples = min_samples
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_timeout = min_timeout
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_domains = max_domains
+        self.domains: "OrderedDict[str, DomainState]" = OrderedDict()
+        self.stats = {
+            "skipped": 0,
+            "trips": 0,
+            "recovered": 0,
+        }
+
+    def _state(self, domain: str) -> DomainState:
+        state = self.domains.get(domain)
+        if state is None:
+            state = self.domains[domain] = DomainState(domain, self.window)
+            # 只保留最近访问的域名
+            while len(self.domains) > self.max_domains:
+                self.domains.popitem(last=False)
+        else:
+            self.domains.move_to_end(domain)
+        return state
+
+    def allow(self, domain: str) -> bool:
+        """熔断中的域名返回 False；冷却期结束后只放行一个试探请求"""
+        if self.failure_threshold <= 0:
+            return True
+        state = self._state(domain)
+        if not state.open_until:
+            return True
+        now = time.monotonic()
+        if now >= state.open_until:
+            state.open_until = now + self.cooldown
+            state.probing = True
+            return True
+        state.skipped += 1
+        self.stats["skipped"] += 1
+        return False
+
+    def timeout_for(self, domain: str, path: str, default: float) -> float:
+        """自适应超时（秒）：该路径样本足够时取耗时分位数乘以系数，不低于 min_timeout，不高于默认超时"""
+        return self._adaptive_timeout(self._state(domain).latencies[path], default)
+
+    def _adaptive_timeout(self, latencies: Deque[float], default: float) -> float:
+        if len(latencies) < self.min_samples:
+            return default
+        ordered = sorted(latencies)
+        index = min(len(ordered) - 1, int(self.percentile * len(ordered)))
+        return min(default, max(self.min_timeout, ordered[index] * self.multiplier))
+
+    def retries_for(self, domain: str, default: int) -> int:
+        """最近失败过或正在试探的域名只尝试一次，不在重试上浪费时间"""
+        state = self._state(domain)
+        return 1 if state.probing or state.consecutive_failures else default
+
+    def record_latency(self, domain: str, path: str, seconds: float):
+        self._state(domain).latencies[path].append(seconds)
+
+    def record_success(self, domain: str):
+        state = self._state(domain)
+        state.successes += 1
+        state.consecutive_failures = 0
+        if state.open_until:
+            self.stats["recovered"] += 1
+            print(f"域名 {domain} 恢复正常，解除熔断")
+        state.open_until = 0.0
+        state.probing = False
+
+    def record_failure(self, domain: str, error: Optional[str] = None):
+        state = self._state(domain)
+        state.failures += 1
+        state.consecutive_failures += 1
+        state.last_error = error
+        if state.probing or (self.failure_threshold > 0 and state.consecutive_failures >= self.failure_threshold
+                             and not state.open_until):
+            state.open_until = time.monotonic() + self.cooldown
+            state.probing = False
+            state.trips += 1
+            self.stats["trips"] += 1
+            print(f"域名 {domain} 连续失败 {state.consecutive_failures} 次，熔断 {self.cooldown} 秒")
+
+    def get_table(self) -> List[Dict]:
+        """域名表，按最近访问排在前面"""
+        now = time.monotonic()
+        table = []
+        for state in reversed(self.domains.values()):
+            latency = {}
+            for path, latencies in state.latencies.items():
+                ordered = sorted(latencies)
+                latency[path] = {
+                    "samples": len(ordered),
+                    "p50": ordered[len(ordered) // 2] if ordered else None,
+                    "p95": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] if ordered else None,
+                    "adaptive_timeout": self._adaptive_timeout(latencies, float("inf")) if len(ordered) >= self.min_samples else None,
+                }
+            table.append({
+                "domain": state.domain,
+                "successes": state.successes,
+                "failures": state.failures,
+                "consecutive_failures": state.consecutive_failures,
+                "latency": latency,
+                "circuit": "half_open" if state.probing else ("open" if state.open_until else "closed"),
+                "open_remaining": max(0.0, state.open_until - now) if state.open_until and not state.probing else 0.0,
+                "trips": state.trips,
+                "skipped": state.skipped,
+                "last_error": state.last_error,
+            })
+        return table
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats["domains"] = len(self.domains)
+        stats["open"] = sum(1 for state in self.domains.values() if state.open_until)
+        return stats
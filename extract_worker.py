@@ -0,0 +1,141 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+from lxml import html as lxml_html
+from lxml.etree import ParserError
+from readability import Document
+from content_filter import ContentFilter
+
+# 与 readability 的 build_doc 一致：按UTF-8字节解析，兼容带 encoding 声明的 XHTML 页面
+_parser = lxml_html.HTMLParser(encoding="utf-8")
+
+# 工作进程内按规则缓存编译好的过滤器
+_filters: Dict[Tuple, ContentFilter] = {}
+
+
+def _get_filter(rules: Dict[str, float], threshold: float) -> ContentFilter:
+    key = (tuple(sorted(rules.items())), threshold)
+    if key not in _filters:
+        _filters[key] = ContentFilter(rules, threshold)
+    return _filters[key]
+
+
+def extract_text(html: str, rules: Dict[str, float], threshold: float) -> Tuple[str, Dict[str, int]]:
+    """在工作进程中执行：从HTML中提取正文，失败或为广告时返回对应标记，同时返回过滤规则命中次数
+
+    整页HTML只用lxml解析一次，解析树直接交给readability，正文片段同样用lxml转换为文本
+    """
+    if not html.strip():
+        return "【提取失败】", {}
+
+    # 提取正文；只有注释或空白等无法解析的页面视为提取失败
+    try:
+        tree = lxml_html.document_fromstring(html.encode("utf-8", "replace"), parser=_parser)
+    except ParserError:
+        return "【提取失败】", {}
+    content = Document(tree).summary(html_partial=True)
+
+    fragment = lxml_html.fragment_fromstring(content, create_parent="div")
+    text = " ".join(piece.strip() for piece in fragment.itertext() if piece.strip())
+
+    # 过滤过短或无效内容
+    if not text or len(text) < 50:
+        return "【提取失败】", {}
+
+    # 过滤广告和登录页等无效内容，只扫描提取后的正文
+    rejected, hits = _get_filter(rules, threshold).check(text)
+    if rejected:
+        return "【广告内容】", hits
+
+    return text, hits
+
+
+class ExtractPool:
+    """正文提取进程池：CPU密集的解析工作不占用事件循环，排队数量有上限，超出时调用方等待（背压）"""
+
+    def __init__(self, workers: Optional[int], queue_size: int, content_filter: ContentFilter, server_processes: int = 1):
+        # workers 为 None 时CPU核数在 server_processes 个服务进程间平分（至少1个），为 0 时在事件循环线程中直接执行
+        self.workers = max(1, (os.cpu_count() or 1) // max(1, server_processes)) if workers is None else workers
+        self.queue_size = queue_size
+        self.content_filter = content_filter
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.semaphore = asyncio.Semaphore(max(self.workers, 1) + queue_size)
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "in_flight": 0,
+            "peak_in_flight": 0,
+            "backpressure_waits": 0,
+            "total_wait_time": 0.0,
+            "total_extract_time": 0.0,
+        }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            # 使用spawn，避免在已有线程和浏览器子进程的进程中fork
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self.executor
+
+    async def extract_text(self, html: str) -> str:
+        text, hits = await self._run(html)
+        self.content_filter.record(text == "【广告内容】", hits)
+        return text
+
+    async def _run(self, html: str) -> Tuple[str, Dict[str, int]]:
+        args = (html, self.content_filter.rules, self.content_filter.threshold)
+        if self.workers == 0:
+            return extract_text(*args)
+
+        start = time.monotonic()
+        if self.semaphore.locked():
+            self.stats["backpressure_waits"] += 1
+        async with self.semaphore:
+            self.stats["total_wait_time"] += time.monotonic() - start
+            self.stats["submitted"] += 1
+            self.stats["in_flight"] += 1
+            self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.stats["in_flight"])
+            extract_start = time.monotonic()
+            executor = self._get_executor()
+            try:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(executor, extract_text, *args)
+                self.stats["completed"] += 1
+                return result
+            except BrokenProcessPool:
+                # 工作进程异常退出，丢弃进程池，下次调用时重建
+                self.stats["failed"] += 1
+                self._discard(executor)
+                raise
+            except Exception:
+                self.stats["failed"] += 1
+                raise
+            finally:
+                self.stats["in_flight"] -= 1
+                self.stats["total_extract_time"] += time.monotonic() - extract_start
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        """丢弃已损坏的进程池：其他调用可能已经重建了新的进程池，只有仍是当前进程池时才清除引用；
+        损坏的进程池中排队的任务都会以 BrokenProcessPool 失败，不取消它们，避免调用方收到 CancelledError
+        """
+        if self.executor is executor:
+            self.executor = None
+        executor.shutdown(wait=False)
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats["workers"] = self.workers
+        stats["queue_size"] = self.queue_size
+        return stats
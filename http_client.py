@@ -0,0 +1,150 @@
+import asyncio
+import codecs
+import re
+from typing import Dict, Optional
+import httpx
+from config import config
+
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+    "Accept-Language": "zh-CN,zh;q=0.8,zh-TW;q=0.7,zh-HK;q=0.5,en-US;q=0.3,en;q=0.2",
+}
+
+
+META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_.:-]+)""", re.IGNORECASE)
+
+
+def sniff_meta_charset(body: bytes) -> Optional[str]:
+    """从页面开头的 <meta charset> 或 http-equiv 声明中取得编码，GB2312/GBK 按其超集 GB18030 解码"""
+    match = META_CHARSET.search(body[:4096])
+    if match is None:
+        return None
+    try:
+        name = codecs.lookup(match.group(1).decode("ascii")).name
+    except (LookupError, UnicodeDecodeError):
+        return None
+    return "gb18030" if name in ("gb2312", "gbk") else name
+
+
+def _http2_available() -> bool:
+    """HTTP/2 需要可选依赖 h2（pip install httpx[http2]）"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class HttpClient:
+    """项目共享的异步HTTP客户端：keep-alive 连接池、可选 HTTP/2、并发上限"""
+
+    def __init__(self):
+        self.client: Optional[httpx.AsyncClient] = None
+        self.semaphore = asyncio.Semaphore(config.HTTP_CONCURRENCY)  # 限制同时进行的请求数量
+        self.stats = {
+            "requests": 0,
+            "errors": 0,
+            "in_flight": 0,
+            "peak_in_flight": 0,
+            "skipped_not_html": 0,
+            "skipped_too_large": 0,
+        }
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self.client is None:
+            http2 = bool(config.HTTP2)
+            if http2 and not _http2_available():
+                print("未安装 h2，HTTP/2 已禁用，使用 HTTP/1.1")
+                http2 = False
+            self.client = httpx.AsyncClient(
+                headers=DEFAULT_HEADERS,
+                follow_redirects=True,
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=config.HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=config.HTTP_MAX_KEEPALIVE
+                ),
+                # config.TIMEOUT 单位为毫秒，httpx 使用秒
+                timeout=config.TIMEOUT / 1000
+            )
+        return self.client
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None,
+                  timeout: Optional[float] = None) -> httpx.Response:
+        """发送GET请求，timeout 单位为秒，默认使用 config.TIMEOUT"""
+        kwargs = {}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        async with self.semaphore:
+            self.stats["requests"] += 1
+            self.stats["in_flight"] += 1
+            self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.stats["in_flight"])
+            try:
+                return await self._get_client().get(url, headers=headers, **kwargs)
+            except Exception:
+                self.stats["errors"] += 1
+                raise
+            finally:
+                self.stats["in_flight"] -= 1
+
+    async def get_page(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None,
+                       max_bytes: Optional[int] = None) -> Optional[httpx.Response]:
+        """流式获取网页：状态码为200时先检查 Content-Type 和 Content-Length，只下载不超过 max_bytes 的HTML，
+        非HTML或超过大小时不读取正文并返回 None；其他状态码（如304）返回不含正文的响应
+        """
+        kwargs = {}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        async with self.semaphore:
+            self.stats["requests"] += 1
+            self.stats["in_flight"] += 1
+            self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.stats["in_flight"])
+            try:
+                client = self._get_client()
+                response = await client.send(client.build_request("GET", url, headers=headers, **kwargs), stream=True)
+                try:
+                    if response.status_code != 200:
+                        return response
+                    if "html" not in response.headers.get("content-type", ""):
+                        self.stats["skipped_not_html"] += 1
+                        return None
+                    length = response.headers.get("content-length", "")
+                    if max_bytes and length.isdigit() and int(length) > max_bytes:
+                        self.stats["skipped_too_large"] += 1
+                        return None
+                    body = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        body.extend(chunk)
+                        if max_bytes and len(body) > max_bytes:
+                            self.stats["skipped_too_large"] += 1
+                            return None
+                finally:
+                    await response.aclose()
+                # 正文已解压，去掉压缩和长度头后构造完整响应，文本解码与普通请求一致
+                headers = [(key, value) for key, value in response.headers.multi_items()
+                           if key.lower() not in ("content-encoding", "content-length")]
+                page = httpx.Response(response.status_code, headers=headers, content=bytes(body), request=response.request)
+                # 响应头没有声明编码时按页面内 <meta charset> 解码，避免 GBK 等中文页面被当作UTF-8解码成乱码
+                if page.charset_encoding is None:
+                    declared = sniff_meta_charset(page.content)
+                    if declared:
+                        page.encoding = declared
+                return page
+            except Exception:
+                self.stats["errors"] += 1
+                raise
+            finally:
+                self.stats["in_flight"] -= 1
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats)
+
+    async def aclose(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+
+http_client = HttpClient()
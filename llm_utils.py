@@ -1,7 +1,13 @@
+import asyncio
 import re
-from typing import List, Optional
-from openai import OpenAI
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+import httpx
+from openai import AsyncOpenAI, OpenAI
+from cache import TTLCache
 from config import config
+from metrics import metrics
+from singleflight import SingleFlight
 
 
 class LLMUtils:
@@ -11,6 +17,41 @@ class LLMUtils:
             api_key="ollama"
         )
         self.model = config.LLM_MODEL
+        # 异步客户端在首次使用时创建，复用连接池
+        self.async_client: Optional[AsyncOpenAI] = None
+        self.semaphore = asyncio.Semaphore(config.LLM_CONCURRENCY)  # 限制同时进行的LLM调用数量
+        # 改写结果缓存，键为规范化后的描述和改写数量；相同描述的并发改写合并为一次LLM调用
+        self.rewrite_cache = TTLCache(
+            ttl=config.REWRITE_CACHE_TTL,
+            max_entries=config.REWRITE_CACHE_MAX_ENTRIES
+        )
+        self.rewrite_flight = SingleFlight("rewrite")
+        self.dedup_stats = {
+            "candidates": 0,
+            "duplicates": 0,
+        }
+
+    def _get_async_client(self) -> AsyncOpenAI:
+        if self.async_client is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=config.LLM_CONCURRENCY,
+                    max_keepalive_connections=config.LLM_CONCURRENCY
+                ),
+                timeout=config.LLM_TIMEOUT
+            )
+            self.async_client = AsyncOpenAI(
+                base_url=config.LLM_BASE_URL,
+                api_key="ollama",
+                http_client=http_client,
+                max_retries=0
+            )
+        return self.async_client
+
+    async def aclose(self):
+        if self.async_client is not None:
+            await self.async_client.close()
+            self.async_client = None
 
     def _filter_think_tags(self, text: str) -> str:
         # 过滤各种形式的think标签
@@ -42,7 +83,32 @@ class LLMUtils:
             print(f"LLM 调用失败: {e}")
             return ""
 
-    def rewrite_keywords(self, description: str, rewrite_num: int = 5) -> List[str]:
+    async def _acall_llm(self, prompt: str, max_tokens: int = 500, timeout: Optional[float] = None) -> str:
+        """异步调用LLM，不阻塞事件循环；并发数受 LLM_CONCURRENCY 限制，单次调用超时 LLM_TIMEOUT 秒"""
+        if timeout is None:
+            timeout = config.LLM_TIMEOUT
+        try:
+            async with self.semaphore:
+                with metrics.span("llm"):
+                    response = await asyncio.wait_for(
+                        self._get_async_client().chat.completions.create(
+                            model=self.model,
+                            messages=[{"role": "user", "content": prompt}],
+                            max_tokens=max_tokens,
+                            temperature=0.7
+                        ),
+                        timeout
+                    )
+            content = response.choices[0].message.content
+            return self._filter_think_tags(content) if content else ""
+        except asyncio.TimeoutError:
+            print(f"LLM 调用超时 ({timeout}秒)")
+            return ""
+        except Exception as e:
+            print(f"LLM 调用失败: {e}")
+            return ""
+
+    def _preset_keywords(self, description: str, rewrite_num: int) -> Optional[List[str]]:
         # 对于新能源车自燃原因的查询，直接返回不同的改写，避免依赖LLM
         if "新能源车自燃" in description:
             return [
@@ -52,47 +118,132 @@ class LLMUtils:
                 "纯电动汽车起火原因",
                 "新能源车辆燃烧原因"
             ][:rewrite_num]
+        return None
+
+    def _rewrite_prompt(self, description: str, rewrite_num: int) -> str:
+        return f"把下面自然语言需求改写成 {rewrite_num} 条**适合搜索引擎的简短关键词**，每条不超过 20 字，不要解释。\n需求：{description}"
+
+    def rewrite_keywords(self, description: str, rewrite_num: int = 5) -> List[str]:
+        preset = self._preset_keywords(description, rewrite_num)
+        if preset is not None:
+            return preset
+        
+        cache_key = self._rewrite_cache_key(description, rewrite_num)
+        cached = self.rewrite_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        
+        response = self._call_llm(self._rewrite_prompt(description, rewrite_num), max_tokens=300)
+        return self._store_rewrite(cache_key, response, description, rewrite_num)
+
+    async def arewrite_keywords(self, description: str, rewrite_num: int = 5) -> List[str]:
+        """rewrite_keywords 的异步版本，供事件循环中的搜索流程调用"""
+        preset = self._preset_keywords(description, rewrite_num)
+        if preset is not None:
+            return preset
+        
+        cache_key = self._rewrite_cache_key(description, rewrite_num)
+        cached = self.rewrite_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
         
-        prompt = f"把下面自然语言需求改写成 {rewrite_num} 条**适合搜索引擎的简短关键词**，每条不超过 20 字，不要解释。\n需求：{description}"
-        response = self._call_llm(prompt, max_tokens=300)
+        async def rewrite() -> List[str]:
+            response = await self._acall_llm(self._rewrite_prompt(description, rewrite_num), max_tokens=300)
+            return self._store_rewrite(cache_key, response, description, rewrite_num)
         
-        keywords = []
+        return list(await self.rewrite_flight.do(cache_key, rewrite))
+
+    def _rewrite_cache_key(self, description: str, rewrite_num: int) -> Tuple[str, int]:
+        return " ".join(unicodedata.normalize("NFKC", description).lower().split()), rewrite_num
+
+    def _store_rewrite(self, cache_key: Tuple[str, int], response: str, description: str, rewrite_num: int) -> List[str]:
+        keywords = self._parse_keywords(response, description, rewrite_num)
+        # LLM调用失败时不缓存，下次重新改写
+        if response:
+            self.rewrite_cache.set(cache_key, list(keywords))
+        return keywords
+
+    def _parse_keywords(self, response: str, description: str, rewrite_num: int) -> List[str]:
+        candidates = []
         for line in response.split('\n'):
             line = line.strip()
             if not line:
                 continue
             line = re.sub(r'^[\d\.\-\*\s]+', '', line)
             if line and len(line) <= 20:
-                keywords.append(line)
-            if len(keywords) >= rewrite_num:
-                break
+                candidates.append(line)
+        
+        # 合并近似重复的改写，每条关键词都会触发一次搜索，只保留互不相似的查询
+        keywords = self._dedup_keywords(candidates)[:rewrite_num]
         
-        # 如果LLM返回结果不足或重复，使用备用改写
-        while len(keywords) < rewrite_num:
-            # 生成不同的备用改写
-            backup_rewrites = [
-                f"{description[:15]} {i}" for i in range(1, rewrite_num + 1)
-            ]
-            for backup in backup_rewrites:
-                if backup not in keywords:
-                    keywords.append(backup)
-                if len(keywords) >= rewrite_num:
-                    break
+        # LLM没有返回可用的关键词时直接用原描述搜索，不再拼接编号凑数
+        if not keywords:
+            keywords = [description.strip()]
         
-        return keywords[:rewrite_num]
+        return keywords
+
+    def _ngrams(self, text: str) -> Set[str]:
+        """规范化后去掉空白，取字符n-gram；文本短于n时整体作为一个n-gram"""
+        n = config.REWRITE_DEDUP_NGRAM
+        compact = "".join(unicodedata.normalize("NFKC", text).lower().split())
+        if len(compact) <= n:
+            return {compact}
+        return {compact[i:i + n] for i in range(len(compact) - n + 1)}
+
+    def _dedup_keywords(self, candidates: List[str]) -> List[str]:
+        """按字符n-gram Jaccard相似度去重，保留先出现的关键词"""
+        kept: List[Tuple[str, Set[str]]] = []
+        for keyword in candidates:
+            grams = self._ngrams(keyword)
+            duplicate = any(
+                len(grams & other) / len(grams | other) >= config.REWRITE_DEDUP_THRESHOLD
+                for _, other in kept
+            )
+            self.dedup_stats["candidates"] += 1
+            if duplicate:
+                self.dedup_stats["duplicates"] += 1
+                continue
+            kept.append((keyword, grams))
+        return [keyword for keyword, _ in kept]
+
+    def get_stats(self) -> Dict:
+        return {
+            "rewrite_cache": self.rewrite_cache.get_stats(),
+            "rewrite_coalescing": self.rewrite_flight.get_stats(),
+            "rewrite_dedup": dict(self.dedup_stats),
+        }
 
     def validate_content(self, text: str) -> bool:
         if not text or len(text) < 50:
             return False
-        prompt = f"下文是网页提取内容，请判断是否为有效正文（非乱码、非登录页、非广告）。只回答 True/False。\n正文：{text[:1000]}"
-        response = self._call_llm(prompt, max_tokens=10)
+        response = self._call_llm(self._validate_prompt(text), max_tokens=10)
         return "true" in response.lower()
 
+    async def avalidate_content(self, text: str) -> bool:
+        if not text or len(text) < 50:
+            return False
+        response = await self._acall_llm(self._validate_prompt(text), max_tokens=10)
+        return "true" in response.lower()
+
+    def _validate_prompt(self, text: str) -> str:
+        return f"下文是网页提取内容，请判断是否为有效正文（非乱码、非登录页、非广告）。只回答 True/False。\n正文：{text[:1000]}"
+
     def summarize_content(self, text: str, max_length: int = 150) -> str:
         if not text:
             return ""
-        prompt = f"请将以下内容摘要成不超过 {max_length} 字的简短摘要：\n{text}"
-        response = self._call_llm(prompt, max_tokens=200)
+        response = self._call_llm(self._summarize_prompt(text, max_length), max_tokens=200)
+        return self._parse_summary(response, text, max_length)
+
+    async def asummarize_content(self, text: str, max_length: int = 150) -> str:
+        if not text:
+            return ""
+        response = await self._acall_llm(self._summarize_prompt(text, max_length), max_tokens=200)
+        return self._parse_summary(response, text, max_length)
+
+    def _summarize_prompt(self, text: str, max_length: int) -> str:
+        return f"请将以下内容摘要成不超过 {max_length} 字的简短摘要：\n{text}"
+
+    def _parse_summary(self, response: str, text: str, max_length: int) -> str:
         if response:
             # 确保在摘要中也过滤think标签
             filtered = self._filter_think_tags(response)
@@ -1,10 +1,17 @@
 import asyncio
+import json
 import signal
 import sys
 from contextlib import asynccontextmanager
-from typing import Any
-from fastmcp import FastMCP
+from typing import Any, AsyncIterator, Optional
+from fastmcp import Context, FastMCP
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
 from config import config
+from debug_capture import debug_capture
+from http_client import http_client
+from llm_utils import llm_utils
+from metrics import metrics
 from search_tools import bing_search_tool
 
 
@@ -13,29 +20,34 @@ async def lifespan(mcp: FastMCP):
     await bing_search_tool.init()
     yield
     await bing_search_tool.close()
+    await llm_utils.aclose()
+    await http_client.aclose()
 
 
 mcp = FastMCP("Bing Search MCP Server", lifespan=lifespan)
 
 
 @mcp.tool()
-async def search_bing(keywords: str, top_k: int = 5) -> list[dict[str, Any]]:
+async def search_bing(keywords: str, top_k: int = 5, timeout: Optional[float] = None) -> list[dict[str, Any]]:
     """
     Bing 关键词搜索并返回详情
     
     Args:
         keywords: 搜索关键词
         top_k: 返回结果数量，默认 5
+        timeout: 时间预算（秒），到期时返回已完成的结果，默认不限时
     
     Returns:
-        搜索结果列表，每项包含 title, summary, link, content
+        搜索结果列表，每项包含 title, summary, link, content, complete（False 表示正文未在时间预算内提取完成）
     """
-    results = await bing_search_tool.search_bing(keywords, top_k)
+    with metrics.span("search_bing"):
+        results = await bing_search_tool.search_bing(keywords, top_k, timeout)
     return [result.to_dict() for result in results]
 
 
 @mcp.tool()
-async def search_bing_rewrite(description: str, rewrite_num: int = 5, top_k: int = 5) -> list[dict[str, Any]]:
+async def search_bing_rewrite(description: str, rewrite_num: int = 5, top_k: int = 5,
+                              timeout: Optional[float] = None) -> list[dict[str, Any]]:
     """
     自然语言→多关键词→Bing 搜索并返回合并详情
     
@@ -43,14 +55,115 @@ async def search_bing_rewrite(description: str, rewrite_num: int = 5, top_k: int
         description: 自然语言描述
         rewrite_num: 改写关键词数量，默认 5
         top_k: 返回结果数量，默认 5
+        timeout: 时间预算（秒），到期时返回已完成的结果，默认不限时
     
     Returns:
-        搜索结果列表，每项包含 title, summary, link, content
+        搜索结果列表，每项包含 title, summary, link, content, complete（False 表示正文未在时间预算内提取完成）
     """
-    results = await bing_search_tool.search_bing_rewrite(description, rewrite_num, top_k)
+    with metrics.span("search_bing_rewrite"):
+        results = await bing_search_tool.search_bing_rewrite(description, rewrite_num, top_k, timeout)
     return [result.to_dict() for result in results]
 
 
+async def _stream_results(ctx: Context, results: AsyncIterator, total: int) -> list[dict[str, Any]]:
+    """逐个推送结果：每个结果通过日志通知发送完整内容，同时发送进度通知，最后发送完成消息"""
+    collected = []
+    async for result in results:
+        item = result.to_dict()
+        collected.append(item)
+        await ctx.info(json.dumps({"type": "result", "index": len(collected) - 1, "result": item}, ensure_ascii=False))
+        await ctx.report_progress(progress=len(collected), total=total)
+    
+    # 提取失败的结果不会产出，完成时把进度补满
+    await ctx.report_progress(progress=total, total=total)
+    await ctx.info(json.dumps({"type": "complete", "count": len(collected)}, ensure_ascii=False))
+    return collected
+
+
+@mcp.tool()
+async def search_bing_stream(keywords: str, ctx: Context, top_k: int = 5) -> list[dict[str, Any]]:
+    """
+    Bing 关键词搜索，每个结果提取完成后立即通过通知推送
+    
+    Args:
+        keywords: 搜索关键词
+        top_k: 返回结果数量，默认 5
+    
+    Returns:
+        搜索结果列表（按完成顺序），每项包含 title, summary, link, content
+    """
+    with metrics.span("search_bing_stream"):
+        return await _stream_results(ctx, bing_search_tool.stream_search_bing(keywords, top_k), top_k)
+
+
+@mcp.tool()
+async def search_bing_rewrite_stream(description: str, ctx: Context, rewrite_num: int = 5,
+                                     top_k: int = 5) -> list[dict[str, Any]]:
+    """
+    自然语言→多关键词→Bing 搜索，每个结果提取完成后立即通过通知推送
+    
+    Args:
+        description: 自然语言描述
+        rewrite_num: 改写关键词数量，默认 5
+        top_k: 返回结果数量，默认 5
+    
+    Returns:
+        搜索结果列表（按完成顺序），每项包含 title, summary, link, content
+    """
+    results = bing_search_tool.stream_search_bing_rewrite(description, rewrite_num, top_k)
+    with metrics.span("search_bing_rewrite_stream"):
+        return await _stream_results(ctx, results, top_k)
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    """Prometheus 文本格式的各阶段耗时直方图；多 worker 模式下每个进程分别统计"""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@mcp.custom_route("/stats", methods=["GET"])
+async def stats_endpoint(request: Request) -> JSONResponse:
+    """浏览器池、缓存、提取等各组件的运行统计"""
+    return JSONResponse(bing_search_tool.get_stats())
+
+
+@mcp.custom_route("/domains", methods=["GET"])
+async def domains_endpoint(request: Request) -> JSONResponse:
+    """各结果站点域名的耗时分位数、自适应超时和熔断状态"""
+    return JSONResponse(bing_search_tool.domain_health.get_table())
+
+
+@mcp.custom_route("/debug/captures", methods=["GET"])
+async def debug_captures_endpoint(request: Request) -> JSONResponse:
+    """调试采集列表（不含HTML），按采集顺序排列"""
+    return JSONResponse({"stats": debug_capture.get_stats(), "entries": debug_capture.list_entries()})
+
+
+@mcp.custom_route("/debug/captures/dump", methods=["POST"])
+async def debug_captures_dump_endpoint(request: Request) -> JSONResponse:
+    """把当前缓冲区中的采集写到 DEBUG_CAPTURE_DIR，返回写出的文件路径"""
+    paths = await asyncio.to_thread(debug_capture.dump, config.DEBUG_CAPTURE_DIR)
+    return JSONResponse({"directory": config.DEBUG_CAPTURE_DIR, "paths": paths})
+
+
+@mcp.custom_route("/debug/captures/{entry_id:int}", methods=["GET"])
+async def debug_capture_endpoint(request: Request) -> PlainTextResponse:
+    """按编号返回采集的页面HTML，以纯文本返回，避免在浏览器中执行页面脚本"""
+    html = debug_capture.get_html(request.path_params["entry_id"])
+    if html is None:
+        return PlainTextResponse("采集不存在或已被淘汰", status_code=404)
+    return PlainTextResponse(html)
+
+
+def create_app():
+    # 默认仅返回JSON响应；开启 MCP_STREAMING 后以SSE响应，工具执行过程中的通知可以实时送达客户端
+    return mcp.http_app(
+        path="/mcp",
+        json_response=not config.MCP_STREAMING,
+        stateless_http=True
+    )
+
+
 def main():
     import uvicorn
     
@@ -78,15 +191,21 @@ def main():
     print(f"MCP 配置参数:")
     print(json.dumps(config_params, indent=2, ensure_ascii=False))
     
-    # 使用http_app，配置为仅返回JSON响应，同时支持带和不带尾部斜杠的路径
-    app = mcp.http_app(
-        path="/mcp",
-        json_response=True,
-        stateless_http=True
-    )
+    if config.MCP_WORKERS > 1:
+        # 多进程模式：每个进程通过工厂函数创建自己的应用，lifespan中启动各自的浏览器资源
+        print(f"工作进程数: {config.MCP_WORKERS}")
+        uvicorn.run(
+            "mcp_server:create_app",
+            factory=True,
+            workers=config.MCP_WORKERS,
+            host="0.0.0.0",
+            port=config.MCP_PORT
+        )
+        return
+    
     # 运行uvicorn服务器
     uvicorn.run(
-        app,
+        create_app(),
         host="0.0.0.0",
         port=config.MCP_PORT
     )
@@ -0,0 +1,136 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# 直方图桶上限（秒），覆盖从毫秒级解析到分钟级LLM调用
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """固定桶的耗时直方图，分位数按桶内线性插值估算（与 Prometheus histogram_quantile 相同）"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)  # 最后一个为 +Inf 桶
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if cumulative + count >= rank and count > 0:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                # 上界不超过观测到的最大值（+Inf 桶同样以最大值作为上界）
+                upper = min(self.buckets[i], self.max) if i < len(self.buckets) else max(self.max, lower)
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.max
+
+    def get_stats(self) -> Dict:
+        stats = {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+        }
+        for q in QUANTILES:
+            stats[f"p{int(q * 100)}"] = self.quantile(q)
+        return stats
+
+
+class Metrics:
+    """按阶段统计耗时：rewrite、pool_wait、serp_navigation、serp_parse、extract、llm 等"""
+
+    def __init__(self, prefix: str = "bing_search"):
+        self.prefix = prefix
+        self.histograms: Dict[str, Histogram] = {}
+        self.errors: Dict[str, int] = {}
+        # (指标名, 标签) -> 当前值，例如各优先级的 Bing 请求排队数
+        self.gauges: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+
+    def observe(self, stage: str, seconds: float):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = Histogram()
+        histogram.observe(seconds)
+
+    def set_gauge(self, name: str, value: float, **labels: str):
+        self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """记录代码块耗时；抛出异常时同时计入该阶段的错误数"""
+        start = time.monotonic()
+        try:
+            yield
+        except Exception:
+            self.errors[stage] = self.errors.get(stage, 0) + 1
+            raise
+        finally:
+            self.observe(stage, time.monotonic() - start)
+
+    def get_stats(self) -> Dict:
+        stats = {}
+        for stage, histogram in self.histograms.items():
+            stats[stage] = histogram.get_stats()
+            stats[stage]["errors"] = self.errors.get(stage, 0)
+        return stats
+
+    def render_prometheus(self) -> str:
+        """以 Prometheus 文本格式输出各阶段的直方图、分位数和错误数"""
+        name = f"{self.prefix}_stage_seconds"
+        lines = [
+            f"# HELP {name} Latency of each search stage in seconds.",
+            f"# TYPE {name} histogram",
+        ]
+        for stage, histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+
+        quantile_name = f"{self.prefix}_stage_quantile_seconds"
+        lines.append(f"# HELP {quantile_name} Estimated latency quantiles of each search stage in seconds.")
+        lines.append(f"# TYPE {quantile_name} gauge")
+        for stage, histogram in sorted(self.histograms.items()):
+            for q in QUANTILES:
+                lines.append(f'{quantile_name}{{stage="{stage}",quantile="{q}"}} {histogram.quantile(q)}')
+
+        errors_name = f"{self.prefix}_stage_errors_total"
+        lines.append(f"# HELP {errors_name} Number of failed spans of each search stage.")
+        lines.append(f"# TYPE {errors_name} counter")
+        for stage in sorted(self.histograms):
+            lines.append(f'{errors_name}{{stage="{stage}"}} {self.errors.get(stage, 0)}')
+
+        declared = set()
+        for (gauge, labels), value in sorted(self.gauges.items()):
+            gauge_name = f"{self.prefix}_{gauge}"
+            if gauge_name not in declared:
+                declared.add(gauge_name)
+                lines.append(f"# TYPE {gauge_name} gauge")
+            label_text = ",".join(f'{key}="{label}"' for key, label in labels)
+            lines.append(f"{gauge_name}{{{label_text}}} {value}" if label_text else f"{gauge_name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# 创建全局实例
+metrics = Metrics()
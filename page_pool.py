@@ -0,0 +1,189 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set
+from playwright.async_api import Page
+
+
+class PagePoolClosed(Exception):
+    """页面池已关闭（例如所属浏览器已崩溃或被回收），调用方可以换一个页面池重试"""
+
+
+class PagePool:
+    """有界页面池：页面数量不超过 max_size，等待者按 FIFO 顺序在页面归还时立即被唤醒"""
+
+    def __init__(self, create_page: Callable[[], Awaitable[Page]], max_size: int):
+        self.create_page = create_page
+        self.max_size = max_size
+        self.idle_pages: List[Page] = []  # 空闲页面
+        self.active_pages: Set[Page] = set()  # 正在使用的页面
+        self.creating = 0  # 正在创建中的页面数量，计入容量
+        self.handing_over = 0  # 已交给等待者但对方尚未恢复运行的页面/名额数量，计入容量
+        # 等待者队列，future 的结果为可用页面，或为 None 表示获得了一个创建新页面的名额
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.closed = False
+        self.stats = {
+            "acquired": 0,
+            "created": 0,
+            "closed": 0,
+            "waited": 0,
+            "timeouts": 0,
+            "cancelled": 0,
+            "total_wait_time": 0.0,
+            "max_wait_time": 0.0,
+            "peak_active": 0,
+        }
+
+    @property
+    def size(self) -> int:
+        return len(self.idle_pages) + len(self.active_pages) + self.creating + self.handing_over
+
+    async def acquire(self, timeout: Optional[float] = None) -> Page:
+        """获取页面，池满时排队等待，超时抛出 asyncio.TimeoutError，页面池关闭时抛出 PagePoolClosed"""
+        if self.closed:
+            raise PagePoolClosed("页面池已关闭")
+        if self.idle_pages:
+            return self._checkout(self.idle_pages.pop())
+
+        if self.size < self.max_size:
+            return await self._create()
+
+        # 池已满，排队等待归还的页面
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.append(future)
+        start = time.monotonic()
+        try:
+            page = await asyncio.wait_for(asyncio.shield(future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if isinstance(e, asyncio.TimeoutError):
+                self.stats["timeouts"] += 1
+            else:
+                self.stats["cancelled"] += 1
+            if future.done() and not future.cancelled():
+                # 页面已经交给我们但调用方放弃了，转交给下一个等待者
+                self.handing_over -= 1
+                self._hand_over(future.result())
+            else:
+                future.cancel()
+                self._remove_waiter(future)
+            raise
+        finally:
+            self._record_wait(time.monotonic() - start)
+
+        self.handing_over -= 1
+        if page is None:
+            return await self._create()
+        return self._checkout(page)
+
+    async def release(self, page: Page, reset: Optional[Callable[[Page], Awaitable[None]]] = None):
+        """归还页面：重置成功则交给等待者或放回空闲池，失败则关闭并让出名额"""
+        if page not in self.active_pages:
+            return
+
+        # 重置期间页面仍计入容量
+        if reset is not None:
+            try:
+                await reset(page)
+            except Exception as e:
+                print(f"重置页面失败，关闭页面: {e}")
+                await self.discard(page)
+                return
+
+        self.active_pages.remove(page)
+        self._hand_over(page)
+
+    async def discard(self, page: Page):
+        """丢弃页面（例如页面已崩溃），关闭后让出名额"""
+        if page not in self.active_pages:
+            return
+        await self._close(page)
+        self.active_pages.remove(page)
+        self._hand_over(None)
+
+    def set_max_size(self, max_size: int):
+        """调整容量上限；容量增加时把新名额交给排队中的调用方"""
+        self.max_size = max_size
+        while self.size < self.max_size and any(not future.done() for future in self.waiters):
+            self._hand_over(None)
+
+    @property
+    def in_use(self) -> int:
+        """已占用的名额：正在使用、创建中和交接中的页面，不含空闲页面"""
+        return self.size - len(self.idle_pages)
+
+    @property
+    def load(self) -> int:
+        """当前负载：正在使用的页面数加排队等待数"""
+        return len(self.active_pages) + len(self.waiters)
+
+    async def close(self):
+        self.closed = True
+        # 通知排队中的调用方页面池已关闭，由调用方决定是否换一个页面池重试
+        for future in self.waiters:
+            if not future.done():
+                future.set_exception(PagePoolClosed("页面池已关闭"))
+        self.waiters.clear()
+        for page in self.idle_pages + list(self.active_pages):
+            await self._close(page)
+        self.idle_pages.clear()
+        self.active_pages.clear()
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats["size"] = self.size
+        stats["active"] = len(self.active_pages)
+        stats["idle"] = len(self.idle_pages)
+        stats["waiting"] = len(self.waiters)
+        stats["max_size"] = self.max_size
+        stats["utilization"] = len(self.active_pages) / self.max_size if self.max_size else 0.0
+        stats["avg_wait_time"] = stats["total_wait_time"] / stats["waited"] if stats["waited"] else 0.0
+        return stats
+
+    async def _create(self) -> Page:
+        self.creating += 1
+        try:
+            page = await self.create_page()
+        except BaseException:
+            self.creating -= 1
+            # 创建失败，把名额让给下一个等待者
+            self._hand_over(None)
+            raise
+        self.creating -= 1
+        self.stats["created"] += 1
+        return self._checkout(page)
+
+    def _checkout(self, page: Page) -> Page:
+        self.active_pages.add(page)
+        self.stats["acquired"] += 1
+        self.stats["peak_active"] = max(self.stats["peak_active"], len(self.active_pages))
+        return page
+
+    def _hand_over(self, page: Optional[Page]):
+        """把页面（或创建名额）交给最早的仍在等待的调用方，没有等待者时放回空闲池"""
+        while self.waiters:
+            future = self.waiters.popleft()
+            if not future.done():
+                # 交接期间仍计入容量，避免被其他调用方抢先创建新页面
+                self.handing_over += 1
+                future.set_result(page)
+                return
+        if page is not None:
+            self.idle_pages.append(page)
+
+    def _remove_waiter(self, future: asyncio.Future):
+        try:
+            self.waiters.remove(future)
+        except ValueError:
+            pass
+
+    def _record_wait(self, elapsed: float):
+        self.stats["waited"] += 1
+        self.stats["total_wait_time"] += elapsed
+        self.stats["max_wait_time"] = max(self.stats["max_wait_time"], elapsed)
+
+    async def _close(self, page: Page):
+        self.stats["closed"] += 1
+        try:
+            await page.close()
+        except Exception as e:
+            print(f"关闭页面失败: {e}")
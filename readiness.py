@@ -0,0 +1,107 @@
+import time
+from typing import Dict
+from playwright.async_api import Page
+
+
+# 在页面内轮询正文长度，连续若干次不再变化即认为渲染完成，整个过程只需一次往返
+TEXT_STABLE_SCRIPT = """
+([interval, rounds, maxWait]) => new Promise(resolve => {
+    const start = performance.now();
+    let last = -1;
+    let stable = 0;
+    const tick = () => {
+        const length = document.body ? document.body.textContent.length : 0;
+        stable = (length > 0 && length === last) ? stable + 1 : 0;
+        last = length;
+        if (stable >= rounds) return resolve(true);
+        if (performance.now() - start >= maxWait) return resolve(false);
+        setTimeout(tick, interval);
+    };
+    tick();
+})
+"""
+
+
+# 页面在 DOMContentLoaded 后跳转（JS 或 meta refresh）时，Playwright 对旧文档的调用会报这些错误
+NAVIGATION_ERRORS = ("Execution context was destroyed", "navigating and changing the content")
+
+# 就绪检测期间最多跟随的跳转次数
+MAX_REDIRECTS = 3
+
+
+def is_navigation_error(error: Exception) -> bool:
+    message = str(error)
+    return any(signature in message for signature in NAVIGATION_ERRORS)
+
+
+class ReadinessDetector:
+    """页面就绪检测，替代固定的 sleep：SERP 等待结果元素出现且文档解析完成，文章等待 DOMContentLoaded 后正文稳定"""
+
+    def __init__(self, stable_interval_ms: int, stable_rounds: int, max_wait_ms: int):
+        self.stable_interval_ms = stable_interval_ms
+        self.stable_rounds = stable_rounds
+        self.max_wait_ms = max_wait_ms
+        self.stats: Dict[str, Dict] = {}
+        self.redirects = 0  # 就绪检测或获取HTML时遇到的页面跳转次数
+
+    async def wait_serp(self, page: Page, timeout: float):
+        """等待 SERP 结果元素 .b_algo 出现，再等待 DOMContentLoaded，超时抛出异常由调用方处理
+
+        Bing 分块输出结果页，第一个 .b_algo 出现时列表可能还没解析完，DOMContentLoaded 后结果才完整；
+        图片等资源已被拦截，这一步等待很短
+        """
+        start = time.monotonic()
+        ready = False
+        try:
+            await page.wait_for_selector(".b_algo", timeout=timeout)
+            await page.wait_for_load_state("domcontentloaded", timeout=timeout)
+            ready = True
+        finally:
+            self._record("serp_selector", time.monotonic() - start, ready)
+
+    async def wait_article(self, page: Page, timeout: float):
+        """等待 DOMContentLoaded，再等待正文长度稳定；正文迟迟不稳定时按现状继续提取
+
+        页面在检测期间跳转时等待新文档的 DOMContentLoaded 后重新检测，跳转次数过多时记为未就绪，不视为加载失败
+        """
+        start = time.monotonic()
+        ready = False
+        try:
+            for _ in range(MAX_REDIRECTS + 1):
+                await page.wait_for_load_state("domcontentloaded", timeout=timeout)
+                max_wait = min(self.max_wait_ms, timeout)
+                try:
+                    ready = await page.evaluate(TEXT_STABLE_SCRIPT, [self.stable_interval_ms, self.stable_rounds, max_wait])
+                    break
+                except Exception as e:
+                    if not is_navigation_error(e):
+                        raise
+                    self.redirects += 1
+        finally:
+            self._record("article_text_stable", time.monotonic() - start, ready)
+
+    async def content(self, page: Page, timeout: float) -> str:
+        """获取页面HTML；页面正在跳转时等待新文档的 DOMContentLoaded 后重试"""
+        for _ in range(MAX_REDIRECTS):
+            try:
+                return await page.content()
+            except Exception as e:
+                if not is_navigation_error(e):
+                    raise
+                self.redirects += 1
+                await page.wait_for_load_state("domcontentloaded", timeout=timeout)
+        return await page.content()
+
+    def _record(self, strategy: str, elapsed: float, ready: bool):
+        stats = self.stats.setdefault(strategy, {"count": 0, "ready": 0, "not_ready": 0, "total_time": 0.0, "max_time": 0.0})
+        stats["count"] += 1
+        stats["ready" if ready else "not_ready"] += 1
+        stats["total_time"] += elapsed
+        stats["max_time"] = max(stats["max_time"], elapsed)
+
+    def get_stats(self) -> Dict:
+        result = {"redirects": self.redirects}
+        for strategy, stats in self.stats.items():
+            result[strategy] = dict(stats)
+            result[strategy]["avg_time"] = stats["total_time"] / stats["count"] if stats["count"] else 0.0
+        return result
@@ -0,0 +1,58 @@
+from typing import Dict, Iterable
+from urllib.parse import urlparse
+from playwright.async_api import BrowserContext, Route
+
+
+class ResourceBlocker:
+    """请求拦截配置：中止不需要的资源类型和广告/统计域名的请求，只保留读取DOM文本所需的资源"""
+
+    def __init__(self, resource_types: Iterable[str], hosts: Iterable[str], bytes_estimate: Dict[str, int]):
+        self.resource_types = set(resource_types)
+        self.hosts = tuple(host.lower().lstrip(".") for host in hosts)
+        self.bytes_estimate = bytes_estimate
+        self.stats = {
+            "allowed_requests": 0,
+            "blocked_requests": 0,
+            "blocked_bytes_estimate": 0,
+            "blocked_by_type": {},
+            "blocked_by_host": {},
+        }
+
+    async def install(self, context: BrowserContext):
+        await context.route("**/*", self.handle)
+
+    def _blocked_host(self, url: str) -> str:
+        host = urlparse(url).hostname or ""
+        for blocked in self.hosts:
+            if host == blocked or host.endswith("." + blocked):
+                return blocked
+        return ""
+
+    async def handle(self, route: Route):
+        request = route.request
+        resource_type = request.resource_type
+        blocked_host = self._blocked_host(request.url)
+
+        if resource_type in self.resource_types or blocked_host:
+            self._record_blocked(resource_type, blocked_host)
+            await route.abort("blockedbyclient")
+            return
+
+        self.stats["allowed_requests"] += 1
+        await route.continue_()
+
+    def _record_blocked(self, resource_type: str, blocked_host: str):
+        self.stats["blocked_requests"] += 1
+        # 被拦截的请求没有实际下载，字节数按资源类型的典型大小估算
+        self.stats["blocked_bytes_estimate"] += self.bytes_estimate.get(resource_type, 0)
+        by_type = self.stats["blocked_by_type"]
+        by_type[resource_type] = by_type.get(resource_type, 0) + 1
+        if blocked_host:
+            by_host = self.stats["blocked_by_host"]
+            by_host[blocked_host] = by_host.get(blocked_host, 0) + 1
+
+    def get_stats(self) -> Dict:
+        return {
+            key: dict(value) if isinstance(value, dict) else value
+            for key, value in self.stats.items()
+        }
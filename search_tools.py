@@ -1,148 +1,232 @@
 import asyncio
-import requests
-from typing import List, Dict, Optional
-from playwright.async_api import async_playwright, Page, Browser, BrowserContext
-from readability import Document
-from bs4 import BeautifulSoup
+import json
+import re
+import sqlite3
+import time
+import unicodedata
+from collections import OrderedDict
+from urllib.parse import urlparse
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+import httpx
+from playwright.async_api import async_playwright, Page
+from bing_scheduler import PRIORITY_FANOUT, PRIORITY_INTERACTIVE, bing_scheduler, is_throttled
+from browser_pool import BrowserPool, BrowserUnavailable
+from cache import TTLCache
 from config import config
+from deadline import Deadline
+from domain_health import DomainHealth
+from content_filter import ContentFilter
+from content_store import ContentStore, StoredContent
+from debug_capture import debug_capture
+from extract_worker import ExtractPool
+from http_client import http_client
 from llm_utils import llm_utils
+from metrics import metrics
+from readiness import ReadinessDetector, is_navigation_error
+from resource_blocker import ResourceBlocker
+from serp_parser import SERP_EXTRACT_SCRIPT, clean_results, parse_serp
+from shared_cache import SharedCache
+from singleflight import SingleFlight
+
+
+class PageLoadError(Exception):
+    """浏览器导航失败或超时，计入域名的熔断统计"""
+
+
+class _CountingPage:
+    """包装 Page，统计实际发出的浏览器往返调用次数（goto、wait_for_*、evaluate、content），其他属性直接转发"""
+
+    ROUND_TRIP_METHODS = {"goto", "wait_for_selector", "wait_for_load_state", "evaluate", "content"}
+
+    def __init__(self, page: Page):
+        self._page = page
+        self.round_trips = 0
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._page, name)
+        if name not in self.ROUND_TRIP_METHODS:
+            return attr
+
+        async def counted(*args, **kwargs):
+            # 调用失败或超时也已经与浏览器往返过一次
+            self.round_trips += 1
+            return await attr(*args, **kwargs)
+        return counted
 
 
 class SearchResult:
-    def __init__(self, title: str, summary: str, link: str, content: str = ""):
+    def __init__(self, title: str, summary: str, link: str, content: str = "", complete: bool = True):
         self.title = title
         self.summary = summary
         self.link = link
         self.content = content
+        self.complete = complete  # False 表示超过时间预算，正文尚未提取完成
 
     def to_dict(self) -> Dict:
         return {
             "title": self.title,
             "summary": self.summary,
             "link": self.link,
-            "content": self.content
+            "content": self.content,
+            "complete": self.complete
         }
 
+    def copy(self) -> "SearchResult":
+        return SearchResult(self.title, self.summary, self.link, self.content, self.complete)
+
 
 class BingSearchTool:
     def __init__(self):
         self.playwright = None
-        self.browser: Optional[Browser] = None
-        self.context: Optional[BrowserContext] = None
-        self.page_pool: List[Page] = []  # 页面池，用于复用页面
-        self.active_pages: Set[Page] = set()  # 正在使用的页面
-        self.max_pages = config.MAX_PAGES  # 最大页面数量
+        self.init_lock = asyncio.Lock()
+        self.max_pages = config.MAX_PAGES  # 最大页面数量（所有浏览器 worker 合计）
+        # SERP结果缓存，键为规范化后的关键词和top_k
+        self.serp_cache = TTLCache(
+            ttl=config.SERP_CACHE_TTL,
+            max_entries=config.SERP_CACHE_MAX_ENTRIES,
+            max_bytes=config.SERP_CACHE_MAX_BYTES,
+            size_of=self._results_size
+        )
+        # 合并进行中的相同搜索和相同URL的提取，并发的重复请求共享一次浏览器导航
+        self.serp_flight = SingleFlight("serp")
+        self.extract_flight = SingleFlight("extract")
+        # 跨进程共享的SERP缓存，多 worker 模式下默认开启
+        shared_enabled = config.SERP_SHARED_CACHE
+        if shared_enabled is None:
+            shared_enabled = config.MCP_WORKERS > 1
+        self.shared_serp_cache: Optional[SharedCache] = SharedCache(
+            path=config.SERP_SHARED_CACHE_PATH,
+            ttl=config.SERP_CACHE_TTL,
+            max_entries=config.SERP_CACHE_MAX_ENTRIES
+        ) if shared_enabled and config.SERP_CACHE_TTL > 0 else None
+        # 正文持久化存储，按URL保存，重启后仍可复用，多 worker 之间共享
+        self.content_store = ContentStore(
+            path=config.CONTENT_STORE_PATH,
+            ttl=config.CONTENT_STORE_TTL,
+            max_entries=config.CONTENT_STORE_MAX_ENTRIES
+        )
+        # 正文提取进程池，HTML解析不占用事件循环
+        self.content_filter = ContentFilter(rules=config.CONTENT_FILTER_RULES, threshold=config.CONTENT_FILTER_THRESHOLD)
+        self.extract_pool = ExtractPool(
+            workers=config.EXTRACT_WORKERS,
+            queue_size=config.EXTRACT_QUEUE_SIZE,
+            content_filter=self.content_filter,
+            server_processes=config.MCP_WORKERS
+        )
+        # 请求拦截配置，中止图片、字体、样式表、媒体以及广告统计域名的请求
+        self.resource_blocker = ResourceBlocker(
+            resource_types=config.BLOCK_RESOURCE_TYPES,
+            hosts=config.BLOCK_HOSTS,
+            bytes_estimate=config.BLOCK_BYTES_ESTIMATE
+        )
+        # 浏览器 worker 池，每个 worker 有独立的浏览器进程、上下文和页面池
+        self.browser_pool = BrowserPool(
+            size=config.BROWSER_WORKERS,
+            max_pages=self.max_pages,
+            resource_blocker=self.resource_blocker if config.BLOCK_RESOURCES else None
+        )
+        # 页面就绪检测，替代固定等待
+        self.readiness = ReadinessDetector(
+            stable_interval_ms=config.READY_STABLE_INTERVAL,
+            stable_rounds=config.READY_STABLE_ROUNDS,
+            max_wait_ms=config.READY_MAX_WAIT
+        )
+        # 每次Playwright搜索的浏览器往返次数统计
+        self.serp_round_trips = {"searches": 0, "total": 0, "last": 0, "max": 0, "avg": 0.0}
+        # 按域名统计正文提取走的路径：http 为静态HTML快速路径，browser 为Playwright；只保留最近访问的域名
+        self.domain_stats: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+        # 按域名记录加载耗时和失败历史，给出自适应超时，连续失败的域名熔断
+        self.domain_health = DomainHealth(
+            window=config.DOMAIN_LATENCY_WINDOW,
+            min_samples=config.DOMAIN_MIN_SAMPLES,
+            percentile=config.DOMAIN_TIMEOUT_PERCENTILE,
+            multiplier=config.DOMAIN_TIMEOUT_MULTIPLIER,
+            min_timeout=config.DOMAIN_MIN_TIMEOUT,
+            failure_threshold=config.DOMAIN_FAILURE_THRESHOLD,
+            cooldown=config.DOMAIN_COOLDOWN,
+            max_domains=config.DOMAIN_MAX_ENTRIES
+        )
 
     async def init(self):
-        if self.playwright is None:
-            self.playwright = await async_playwright().start()
-            # 优化浏览器启动配置
-            self.browser = await self.playwright.chromium.launch(
-                headless=True,
-                args=[
-                    "--disable-gpu",
-                    "--disable-extensions",
-                    "--disable-features=NetworkService",
-                    "--disable-features=VizDisplayCompositor",
-                    "--disable-dev-shm-usage",
-                    "--no-sandbox"
-                ]
-            )
-            self.context = await self.browser.new_context(
-                viewport={"width": 1920, "height": 1080},
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-            )
+        async with self.init_lock:
+            if self.playwright is None:
+                self.playwright = await async_playwright().start()
+                await self.browser_pool.start(self.playwright)
 
     async def close(self):
-        # 关闭所有页面
-        for page in self.page_pool:
-            await page.close()
-        for page in self.active_pages:
-            await page.close()
-        # 关闭上下文和浏览器
-        if self.context:
-            await self.context.close()
-        if self.browser:
-            await self.browser.close()
+        # 关闭所有浏览器 worker 及其页面
+        await self.browser_pool.close()
+        self.content_store.close()
+        if self.shared_serp_cache is not None:
+            self.shared_serp_cache.close()
+        self.extract_pool.close()
+        bing_scheduler.close()
         if self.playwright:
             await self.playwright.stop()
 
-    async def _get_page(self, max_retries: int = 10) -> Page:
-        if not self.context:
+    def get_stats(self) -> Dict:
+        """运行统计，用于根据等待时间和利用率调整 MAX_PAGES"""
+        return {
+            "browser_pool": self.browser_pool.get_stats(),
+            "serp_cache": self.serp_cache.get_stats(),
+            "shared_serp_cache": self.shared_serp_cache.get_stats() if self.shared_serp_cache else None,
+            "content_store": self.content_store.get_stats(),
+            "extract_paths": dict(self.domain_stats),
+            "domain_health": self.domain_health.get_stats(),
+            "resource_blocker": self.resource_blocker.get_stats(),
+            "readiness": self.readiness.get_stats(),
+            "http_client": http_client.get_stats(),
+            "debug_capture": debug_capture.get_stats(),
+            "serp_round_trips": dict(self.serp_round_trips),
+            "extract_pool": self.extract_pool.get_stats(),
+            "content_filter": self.content_filter.get_stats(),
+            "stages": metrics.get_stats(),
+            "llm": llm_utils.get_stats(),
+            "bing_scheduler": bing_scheduler.get_stats(),
+            "coalescing": {
+                "serp": self.serp_flight.get_stats(),
+                "extract": self.extract_flight.get_stats(),
+            }
+        }
+
+    def _record_round_trips(self, round_trips: int):
+        stats = self.serp_round_trips
+        stats["searches"] += 1
+        stats["total"] += round_trips
+        stats["last"] = round_trips
+        stats["max"] = max(stats["max"], round_trips)
+        stats["avg"] = stats["total"] / stats["searches"]
+
+    async def _get_page(self) -> Page:
+        """从负载最低的浏览器 worker 获取页面，池满时排队等待，超过 PAGE_ACQUIRE_TIMEOUT 秒抛出超时"""
+        if self.playwright is None:
             await self.init()
+        with metrics.span("pool_wait"):
+            return await self.browser_pool.acquire(timeout=config.PAGE_ACQUIRE_TIMEOUT)
         
-        # 优先从页面池获取可用页面
-        if self.page_pool:
-            page = self.page_pool.pop()
-            self.active_pages.add(page)
-            return page
-        
-        # 获取当前浏览器上下文的实际页面数量
-        def get_current_page_count():
-            """获取当前浏览器上下文的实际页面数量"""
-            # Playwright的BrowserContext没有直接的页面数量属性，我们需要通过active_pages和page_pool来计算
-            return len(self.active_pages) + len(self.page_pool)
-        
-        # 如果未达到最大页面数量，创建新页面
-        if get_current_page_count() < self.max_pages:
-            page = await self.context.new_page()
-            self.active_pages.add(page)
-            return page
-        
-        # 如果已达到最大页面数量，等待并复用
-        # 这里采用简单的等待机制，实际生产环境可以考虑使用队列或事件
-        if max_retries > 0:
-            await asyncio.sleep(0.5)  # 等待0.5秒后重试，减少等待时间
-            return await self._get_page(max_retries - 1)
-        else:
-            # 达到最大重试次数，返回一个错误或创建新页面
-            # 这里我们选择直接创建新页面，避免无限等待
-            print("已达到最大重试次数，创建新页面")
-            page = await self.context.new_page()
-            self.active_pages.add(page)
-            return page
-        
-    async def _release_page(self, page: Page):
-        """释放页面，将其放回页面池或关闭"""
-        if page in self.active_pages:
-            self.active_pages.remove(page)
-            
-            # 如果页面池未满，将页面放回页面池
-            if len(self.page_pool) < self.max_pages:
-                try:
-                    # 重置页面状态
-                    await page.goto("about:blank")
-                    await page.wait_for_load_state("load")
-                    self.page_pool.append(page)
-                except Exception as e:
-                    # 重置失败，关闭页面
-                    print(f"重置页面失败，关闭页面: {e}")
-                    await page.close()
-            else:
-                # 页面池已满，关闭页面
-                await page.close()
+    async def _release_page(self, page: Optional[Page]):
+        """释放页面，重置后放回所属 worker 的页面池，重置失败则关闭"""
+        if page is None:
+            return
+        await self.browser_pool.release(page, reset=self._reset_page)
+
+    async def _reset_page(self, page: Page):
+        # 重置页面状态
+        await page.goto("about:blank")
+        await page.wait_for_load_state("load")
 
-    def _search_bing_with_requests(self, keywords: str, top_k: int = 5) -> List[SearchResult]:
-        """使用requests库直接发送HTTP请求搜索Bing"""
+    async def _search_bing_with_http(self, keywords: str, top_k: int = 5,
+                                     priority: int = PRIORITY_INTERACTIVE) -> List[SearchResult]:
+        """使用共享的异步HTTP客户端直接请求Bing搜索页，请求经过 Bing 调度器限速"""
         results = []
         try:
-            # 过滤无效字符，只保留有效的搜索关键词
-            # 移除#、*、"等特殊字符，只保留中文、英文、数字和常用标点
-            import re
-            filtered_keywords = re.sub(r'[#*"<>|%^&\(\)\[\]{}\\|]+', '', keywords)
-            filtered_keywords = filtered_keywords.strip()
-            print(f"过滤后的关键词: {filtered_keywords}")
+            filtered_keywords = self._filter_keywords(keywords)
             
             search_url = f"{config.BING_URL}/search?q={filtered_keywords}"
-            print(f"使用requests访问搜索URL: {search_url}")
+            print(f"使用HTTP访问搜索URL: {search_url}")
             
-            # 设置headers模拟浏览器
+            # 设置headers模拟浏览器，User-Agent等通用头由共享客户端提供
             headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-                "Accept-Language": "zh-CN,zh;q=0.8,zh-TW;q=0.7,zh-HK;q=0.5,en-US;q=0.3,en;q=0.2",
-                "Accept-Encoding": "gzip, deflate, br",
-                "Connection": "keep-alive",
                 "Upgrade-Insecure-Requests": "1",
                 "Sec-Fetch-Dest": "document",
                 "Sec-Fetch-Mode": "navigate",
@@ -151,248 +235,511 @@ class BingSearchTool:
             }
             
             # 发送请求
-            response = requests.get(search_url, headers=headers, timeout=config.TIMEOUT)
-            response.raise_for_status()
-            
-            # 保存页面内容用于调试
-            with open("bing_requests_page.html", "w", encoding="utf-8") as f:
-                f.write(response.text)
-            print("已保存requests搜索页面HTML到 bing_requests_page.html")
-            
-            # 使用BeautifulSoup解析页面
-            soup = BeautifulSoup(response.text, "lxml")
+            await bing_scheduler.acquire(priority)
+            with metrics.span("serp_http"):
+                response = await http_client.get(search_url, headers=headers)
             
-            # 尝试多种方式提取搜索结果
-            result_containers = []
+            # 按采样保存页面内容用于调试，默认关闭
+            debug_capture.capture("serp_http", response.text, query=filtered_keywords, url=search_url)
             
-            # 方法1：使用Bing特有的class
-            result_containers.extend(soup.find_all(class_="b_algo"))
+            # 单次遍历解析结果，排除广告，还原Bing跳转链接
+            with metrics.span("serp_parse"):
+                parsed = parse_serp(response.text, top_k) if response.status_code == 200 else []
+            print(f"找到 {len(parsed)} 个搜索结果")
             
-            # 方法2：查找包含h2和链接的div
-            for div in soup.find_all("div"):
-                h2 = div.find("h2")
-                if h2 and h2.find("a"):
-                    result_containers.append(div)
-            
-            print(f"找到 {len(result_containers)} 个搜索结果容器")
+            # 没有结果时检查是否被限流，限流时后续 Bing 请求统一退避
+            if parsed:
+                await bing_scheduler.report_ok()
+            else:
+                reason = is_throttled(response.status_code, str(response.url), response.text)
+                if reason:
+                    await bing_scheduler.report_throttled(reason)
+                    return results
+                response.raise_for_status()
             
-            # 遍历结果容器
-            seen_links = set()
-            for container in result_containers:
-                try:
-                    # 提取标题和链接
-                    h2 = container.find("h2")
-                    if not h2:
-                        continue
-                    
-                    link = h2.find("a")
-                    if not link:
-                        continue
-                    
-                    title = link.get_text(strip=True)
-                    href = link.get("href")
-                    
-                    if not href or not href.startswith("http") or len(title) < 5:
-                        continue
-                    
-                    # 避免重复链接
-                    if href in seen_links:
-                        continue
-                    seen_links.add(href)
-                    
-                    # 提取摘要
-                    summary = ""
-                    # 查找第一个p标签作为摘要
-                    p_tag = container.find("p")
-                    if p_tag:
-                        summary = p_tag.get_text(strip=True)[:150]
-                    
-                    # 添加到结果
-                    results.append(SearchResult(title=title, summary=summary, link=href))
-                    print(f"添加结果: {title[:30]}...")
-                    
-                    if len(results) >= top_k:
-                        break
-                except Exception as e:
-                    print(f"处理单个结果失败: {e}")
-                    continue
+            for item in parsed:
+                results.append(SearchResult(title=item["title"], summary=item["summary"], link=item["link"]))
+                print(f"添加结果: {item['title'][:30]}...")
         except Exception as e:
-            print(f"requests搜索失败: {e}")
+            print(f"HTTP搜索失败: {e}")
         
         return results
     
-    async def search_bing(self, keywords: str, top_k: int = 5) -> List[SearchResult]:
-        """搜索Bing，先尝试Playwright，失败则使用requests"""
-        results = []
+    async def search_bing(self, keywords: str, top_k: int = 5, timeout: Optional[float] = None) -> List[SearchResult]:
+        """搜索Bing，先尝试Playwright，失败则使用HTTP请求；timeout 为整个调用的时间预算（秒）"""
+        deadline = Deadline(timeout)
+        try:
+            results = await deadline.run(self._search_serp(keywords, top_k, PRIORITY_INTERACTIVE))
+        except asyncio.TimeoutError:
+            print(f"获取SERP超过时间预算 ({timeout}秒): {keywords}")
+            return []
         
+        # 处理结果，并发提取内容（结果保持SERP顺序）
+        return await self._fill_contents(results[:top_k], deadline)
+
+    def _filter_keywords(self, keywords: str) -> str:
         # 过滤无效字符，只保留有效的搜索关键词
         # 移除#、*、"等特殊字符，只保留中文、英文、数字和常用标点
-        import re
-        filtered_keywords = re.sub(r'[#*"<>|%^&\(\)\[\]{}|]+', '', keywords)
+        filtered_keywords = re.sub(r'[#*"<>|%^&\(\)\[\]{}\\|]+', '', keywords)
         filtered_keywords = filtered_keywords.strip()
         print(f"过滤后的关键词: {filtered_keywords}")
+        return filtered_keywords
+
+    def _normalize_keywords(self, filtered_keywords: str) -> str:
+        """规范化关键词作为缓存键：全半角统一、忽略大小写、合并空白"""
+        normalized = unicodedata.normalize("NFKC", filtered_keywords).lower()
+        return " ".join(normalized.split())
+
+    @staticmethod
+    def _results_size(results: List[SearchResult]) -> int:
+        """估算结果列表占用的内存字节数"""
+        return sum(
+            200 + len(result.title) * 4 + len(result.summary) * 4 + len(result.link) + len(result.content) * 4
+            for result in results
+        )
+
+    async def _search_serp(self, keywords: str, top_k: int = 5,
+                           priority: int = PRIORITY_INTERACTIVE) -> List[SearchResult]:
+        """只获取SERP结果列表（标题、摘要、链接），不提取正文，优先使用缓存；priority 决定发往 Bing 的排队顺序"""
+        filtered_keywords = self._filter_keywords(keywords)
+        cache_key = (self._normalize_keywords(filtered_keywords), top_k)
+        
+        cached = self.serp_cache.get(cache_key)
+        if cached is not None:
+            print(f"SERP缓存命中: {filtered_keywords}")
+            # 返回副本，避免提取正文时修改缓存中的结果
+            return [result.copy() for result in cached]
+        
+        # 相同关键词的并发搜索共享同一次获取，每个调用方拿到各自的副本
+        results = await self.serp_flight.do(cache_key, lambda: self._load_serp(filtered_keywords, cache_key, priority))
+        return [result.copy() for result in results]
+
+    async def _load_serp(self, filtered_keywords: str, cache_key: Tuple[str, int], priority: int) -> List[SearchResult]:
+        """内存缓存未命中时获取SERP：先查跨进程共享缓存，再实际搜索，结果写入两级缓存；
+        共享缓存的SQLite出错时按未命中处理、跳过写入
+        """
+        _, top_k = cache_key
+        
+        # 多 worker 模式下查询跨进程共享缓存
+        shared_key = json.dumps(cache_key, ensure_ascii=False)
+        if self.shared_serp_cache is not None:
+            try:
+                shared = await self.shared_serp_cache.aget(shared_key)
+            except sqlite3.Error as e:
+                print(f"读取共享SERP缓存失败，按未命中处理: {e}")
+                shared = None
+            if shared is not None:
+                print(f"共享SERP缓存命中: {filtered_keywords}")
+                results = [SearchResult(**item) for item in shared]
+                self.serp_cache.set(cache_key, [result.copy() for result in results])
+                return results
+        
+        results = await self._fetch_serp(filtered_keywords, top_k, priority)
+        if results:
+            self.serp_cache.set(cache_key, [result.copy() for result in results])
+            if self.shared_serp_cache is not None:
+                try:
+                    await self.shared_serp_cache.aset(shared_key, [result.to_dict() for result in results])
+                except sqlite3.Error as e:
+                    print(f"写入共享SERP缓存失败，跳过: {e}")
+        return results
+
+    async def _fetch_serp(self, filtered_keywords: str, top_k: int = 5,
+                          priority: int = PRIORITY_INTERACTIVE) -> List[SearchResult]:
+        results = []
+        round_trips = 0  # 本次搜索与浏览器之间的往返次数（不含页面池获取与归还），按实际调用统计
+        throttled = False
         
         # 1. 先尝试使用Playwright搜索
         for attempt in range(config.MAX_RETRY):
+            page = None
+            tab = None
             try:
+                # 先在调度器中排队，轮到后再占用页面
+                await bing_scheduler.acquire(priority)
                 page = await self._get_page()
+                tab = _CountingPage(page)
                 
                 # 直接构建搜索URL
                 search_url = f"{config.BING_URL}/search?q={filtered_keywords}"
                 print(f"直接访问搜索URL: {search_url}")
                 
-                await page.goto(search_url, timeout=config.TIMEOUT)
-                await page.wait_for_load_state("load", timeout=config.TIMEOUT)
-                await asyncio.sleep(2)
+                # 不等待load事件，结果元素出现且DOMContentLoaded后即可解析
+                with metrics.span("serp_navigation"):
+                    response = await tab.goto(search_url, timeout=config.TIMEOUT, wait_until="commit")
                 
                 # 尝试获取搜索结果
                 try:
-                    await page.wait_for_selector(".b_algo", timeout=config.TIMEOUT)
-                    result_elements = await page.locator(".b_algo").all()
+                    with metrics.span("serp_ready"):
+                        await self.readiness.wait_serp(tab, timeout=config.TIMEOUT)
                     
-                    if len(result_elements) > 0:
-                        print(f"使用Playwright找到 {len(result_elements)} 个搜索结果")
-                        
-                        # 提取结果
-                        seen_links = set()
-                        for result_el in result_elements:
-                            try:
-                                title_el = result_el.locator("h2 a")
-                                if await title_el.count() == 0:
-                                    continue
-                                
-                                title = await title_el.inner_text()
-                                href = await title_el.get_attribute("href")
-                                
-                                if not href or not href.startswith("http") or len(title) < 5:
-                                    continue
-                                
-                                if href in seen_links:
-                                    continue
-                                seen_links.add(href)
-                                
-                                summary = ""
-                                summary_el = result_el.locator(".b_caption p").first
-                                if await summary_el.count() > 0:
-                                    summary_text = await summary_el.inner_text()
-                                    summary = summary_text[:150]
-                                
-                                results.append(SearchResult(title=title, summary=summary, link=href))
-                                print(f"添加结果: {title[:30]}...")
-                                
-                                if len(results) >= top_k:
-                                    break
-                            except Exception as e:
-                                continue
+                    # 在页面内一次取出全部结果，避免逐个元素往返
+                    with metrics.span("serp_parse"):
+                        items = await tab.evaluate(SERP_EXTRACT_SCRIPT)
+                        cleaned = clean_results(items, top_k)
+                    print(f"使用Playwright找到 {len(items)} 个搜索结果")
+                    
+                    for item in cleaned:
+                        results.append(SearchResult(title=item["title"], summary=item["summary"], link=item["link"]))
+                        print(f"添加结果: {item['title'][:30]}...")
                 except Exception as e:
                     print(f"Playwright获取结果失败: {e}")
                 
-                await self._release_page(page)
+                if results:
+                    await bing_scheduler.report_ok()
+                else:
+                    # 没有解析到结果时检查是否被限流，否则按采样保存页面，便于排查选择器失效
+                    page_html = await tab.content()
+                    reason = is_throttled(response.status if response else None, page.url, page_html)
+                    if reason:
+                        await bing_scheduler.report_throttled(reason)
+                        throttled = True
+                    elif debug_capture.should_capture(filtered_keywords, search_url):
+                        debug_capture.capture("serp_playwright", page_html, filtered_keywords, search_url, checked=True)
             except Exception as e:
                 print(f"Playwright搜索失败 (尝试 {attempt + 1}/{config.MAX_RETRY}): {e}")
+            finally:
+                if tab is not None:
+                    round_trips += tab.round_trips
+                await self._release_page(page)
+            
+            # 已获取到结果，或被限流（立即重试只会继续被限流），不再重试
+            if results or throttled:
+                break
         
-        # 2. 如果Playwright失败或没有结果，使用requests作为备选
-        if not results:
-            print("Playwright搜索失败或没有结果，尝试使用requests搜索...")
-            results = self._search_bing_with_requests(keywords, top_k)
+        self._record_round_trips(round_trips)
+        
+        # 2. 如果Playwright失败或没有结果，使用HTTP请求作为备选；被限流时直接返回，不在退避结束时再多发一次请求
+        if not results and not throttled:
+            print("Playwright搜索失败或没有结果，尝试使用HTTP搜索...")
+            results = await self._search_bing_with_http(filtered_keywords, top_k, priority)
         
         # 移除模拟数据备用方案，确保只返回真实搜索结果
+        return results[:top_k]
+
+    async def _fill_content(self, result: SearchResult) -> Optional[SearchResult]:
+        """提取单个结果的正文，正文无效时返回 None"""
+        try:
+            content = await self._extract_content(result.link)
+            if content in ["【提取失败】", "【广告内容】"]:
+                return None
+            result.content = content
+            print(f"成功提取内容: {result.title[:30]}...")
+        except Exception as e:
+            print(f"处理结果 '{result.title}' 失败: {e}")
+            # 如果提取内容失败，仍然保留结果，只是内容为空
+        return result
+
+    async def _fill_contents(self, results: List[SearchResult], deadline: Optional[Deadline] = None) -> List[SearchResult]:
+        """并发提取结果正文，返回顺序与输入一致；超过时间预算时取消未完成的提取，对应结果标记为不完整"""
+        if not results:
+            return []
+        tasks = [asyncio.create_task(self._fill_content(result)) for result in results]
+        _, pending = await asyncio.wait(tasks, timeout=deadline.remaining() if deadline else None)
+        for task in pending:
+            task.cancel()
+        if pending:
+            print(f"超过时间预算，取消 {len(pending)} 个未完成的正文提取")
         
-        # 处理结果，提取内容
-        valid_results = []
-        for result in results[:top_k]:  # 处理前top_k个结果
+        # 返回所有有效结果，即使数量不足top_k；未完成的结果只保留标题和摘要
+        filled = []
+        for result, task in zip(results, tasks):
+            if task in pending:
+                result.content = ""
+                result.complete = False
+                filled.append(result)
+            elif task.result() is not None:
+                filled.append(task.result())
+        return filled
+
+    async def _iter_contents(self, results: List[SearchResult]) -> AsyncIterator[SearchResult]:
+        """并发提取结果正文，按完成顺序逐个产出有效结果；调用方提前退出时取消剩余的提取"""
+        tasks = [asyncio.create_task(self._fill_content(result)) for result in results]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                if result is not None:
+                    yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _extract_content(self, url: str) -> str:
+        """提取正文，同一URL的并发提取合并为一次
+
+        不设整体并发上限：浏览器加载受页面池（MAX_PAGES）限制，HTTP请求受 HTTP_CONCURRENCY 限制，
+        HTML解析受提取进程池的排队上限限制，命中正文存储的URL不必等待慢速的浏览器加载
+        """
+        async def extract() -> str:
+            with metrics.span("extract"):
+                return await self._extract_content_once(url)
+        
+        return await self.extract_flight.do(url, extract)
+
+    async def _extract_content_once(self, url: str) -> str:
+        """提取正文，优先使用持久化存储中的内容，过期后通过 ETag/Last-Modified 重新验证
+
+        存储只是加速手段：SQLite 出错（磁盘满、文件被锁等）时按未命中处理、跳过写入，不影响正文提取
+        """
+        if not self.content_store.enabled:
+            content, _ = await self._load_content(url)
+            return content
+        
+        try:
+            stored = await self.content_store.aget(url)
+        except sqlite3.Error as e:
+            print(f"读取正文存储失败，按未命中处理: {e}")
+            stored = None
+        response = None
+        if stored is not None:
+            if stored.fresh:
+                return stored.content
+            if stored.revalidatable:
+                response = await self._revalidate(stored)
+                if response is not None and response.status_code == 304:
+                    try:
+                        await self.content_store.atouch(url)
+                    except sqlite3.Error as e:
+                        print(f"刷新正文存储失败: {e}")
+                    return stored.content
+        
+        # 条件请求返回200时页面已更新，直接用其响应提取正文，不再重复下载
+        content, validators = await self._load_content(url, response if response is not None and response.status_code == 200 else None)
+        if content not in ["【提取失败】", "【广告内容】"]:
+            try:
+                await self.content_store.aput(url, content, validators.get("etag"), validators.get("last-modified"))
+            except sqlite3.Error as e:
+                print(f"写入正文存储失败，跳过: {e}")
+        return content
+
+    async def _revalidate(self, stored: StoredContent) -> Optional[httpx.Response]:
+        """发送条件请求：304表示存储的内容仍然有效，200时响应中带有新的HTML和校验头；请求失败时返回 None"""
+        try:
+            return await http_client.get_page(stored.url, headers=stored.conditional_headers(),
+                                              max_bytes=config.HTTP_FAST_PATH_MAX_BYTES)
+        except Exception as e:
+            print(f"重新验证内容失败: {e}")
+            return None
+
+    async def _load_content(self, url: str, prefetched: Optional[httpx.Response] = None) -> Tuple[str, Dict[str, str]]:
+        """按域名健康状况加载正文：熔断中的域名直接失败，其余按自适应超时加载，并记录结果
+
+        只有浏览器导航出错或超时才计为失败（HTTP快速路径失败时会改用浏览器），页面加载成功但正文过短不影响熔断
+        """
+        domain = urlparse(url).netloc.lower()
+        if not self.domain_health.allow(domain):
+            print(f"域名 {domain} 处于熔断中，跳过: {url}")
+            return "【提取失败】", {}
+        
+        try:
+            content, validators = await self._load_content_adaptive(url, domain, prefetched)
+        except PageLoadError as e:
+            self.domain_health.record_failure(domain, str(e))
+            return "【提取失败】", {}
+        self.domain_health.record_success(domain)
+        return content, validators
+
+    async def _load_content_adaptive(self, url: str, domain: str,
+                                     prefetched: Optional[httpx.Response] = None) -> Tuple[str, Dict[str, str]]:
+        """先尝试HTTP直接获取静态HTML提取正文，内容不足时再使用浏览器加载；prefetched 为重新验证时已取得的200响应"""
+        stats = self._path_stats(domain)
+        
+        if config.HTTP_FAST_PATH or prefetched is not None:
             try:
-                content = await self._extract_content(result.link)
-                if content not in ["【提取失败】", "【广告内容】"]:
-                    result.content = content
-                    valid_results.append(result)
-                    print(f"成功提取内容: {result.title[:30]}...")
+                response = prefetched
+                if response is None:
+                    start = time.monotonic()
+                    # 流式获取，非HTML（如PDF）或超过 HTTP_FAST_PATH_MAX_BYTES 的页面不下载正文
+                    response = await http_client.get_page(url, timeout=self.domain_health.timeout_for(domain, "http", config.TIMEOUT / 1000),
+                                                          max_bytes=config.HTTP_FAST_PATH_MAX_BYTES)
+                    if response is not None and response.status_code == 200:
+                        # 只记录成功响应的耗时，快速返回的403等错误页不参与自适应超时
+                        self.domain_health.record_latency(domain, "http", time.monotonic() - start)
+                if response is not None and response.status_code == 200:
+                    validators = {key: response.headers[key] for key in ("etag", "last-modified") if key in response.headers}
+                    html = response.text
+                    content = await self._html_to_text(html)
+                    if self._is_static_sufficient(html, content):
+                        stats["http"] += 1
+                        return content, validators
+                stats["http_insufficient"] += 1
             except Exception as e:
-                print(f"处理结果 '{result.title}' 失败: {e}")
-                # 如果提取内容失败，仍然保留结果，只是内容为空
-                valid_results.append(result)
+                print(f"HTTP快速路径获取失败，改用浏览器: {e}")
+                stats["http_error"] += 1
         
-        # 返回所有有效结果，即使数量不足top_k
-        return valid_results
+        stats["browser"] += 1
+        return await self._load_content_with_browser(url, domain)
 
-    async def _extract_content(self, url: str) -> str:
-        for attempt in range(config.MAX_RETRY):
+    def _path_stats(self, domain: str) -> Dict[str, int]:
+        stats = self.domain_stats.get(domain)
+        if stats is None:
+            stats = self.domain_stats[domain] = {"http": 0, "browser": 0, "http_insufficient": 0, "http_error": 0}
+            while len(self.domain_stats) > config.DOMAIN_MAX_ENTRIES:
+                self.domain_stats.popitem(last=False)
+        else:
+            self.domain_stats.move_to_end(domain)
+        return stats
+
+    def _is_static_sufficient(self, html: str, content: str) -> bool:
+        """判断静态HTML是否足够：正文足够长，且不是需要JS渲染的页面外壳"""
+        if content == "【广告内容】":
+            return True
+        if content == "【提取失败】" or len(content) < config.HTTP_FAST_PATH_MIN_TEXT:
+            return False
+        html_lower = html.lower()
+        return not any(signature in html_lower for signature in config.JS_SHELL_SIGNATURES)
+
+    async def _load_content_with_browser(self, url: str, domain: str) -> Tuple[str, Dict[str, str]]:
+        """使用浏览器加载页面并提取正文，同时返回用于重新验证的响应头；超时和重试次数按域名调整
+
+        导航或就绪检测失败、超时时抛出 PageLoadError；获取页面超时或浏览器 worker 崩溃抛出其他异常，不计入域名失败
+        """
+        html, validators = await self._load_html_with_browser(url, domain)
+        return await self._html_to_text(html), validators
+
+    async def _load_html_with_browser(self, url: str, domain: str) -> Tuple[str, Dict[str, str]]:
+        validators: Dict[str, str] = {}
+        retries = self.domain_health.retries_for(domain, config.MAX_RETRY)
+        last_error = None
+        worker_error = None
+        for attempt in range(retries):
+            # 页面池等待超时等异常与目标站点无关，直接抛出，不计入域名失败
+            page = await self._get_page()
             try:
-                page = await self._get_page()
-                
-                # 增加超时时间，处理连接问题
-                await page.goto(url, timeout=config.TIMEOUT * 2)
-                
-                # 只等待load状态，不等待networkidle，减少超时风险
-                await page.wait_for_load_state("load", timeout=config.TIMEOUT * 2)
-                await asyncio.sleep(1)  # 额外等待1秒
-                
-                # 尝试获取HTML内容，处理页面导航问题
-                html = await page.content()
-                await self._release_page(page)
-                
-                # 过滤广告内容
-                if any(ad in html.lower() for ad in ['广告', 'advertisement', 'sponsored', '推广', 'promoted']):
-                    return "【广告内容】"
-                
-                # 提取正文
-                doc = Document(html)
-                content = doc.summary()
-                
-                soup = BeautifulSoup(content, 'lxml')
-                text = soup.get_text(separator=' ', strip=True)
-                
-                # 过滤过短或无效内容
-                if not text or len(text) < 50:
-                    return "【提取失败】"
-                
-                # 过滤广告和无效内容
-                if any(ad in text.lower() for ad in ['广告', '推广', '点击下载', '注册', '登录']):
-                    return "【广告内容】"
+                # 默认超时为 TIMEOUT*2，有足够历史样本的域名使用自适应超时
+                timeout = self.domain_health.timeout_for(domain, "browser", config.TIMEOUT * 2 / 1000) * 1000
+                with metrics.span("page_navigation"):
+                    start = time.monotonic()
+                    response = await page.goto(url, timeout=timeout, wait_until="commit")
+                    if response is not None:
+                        headers = response.headers
+                        validators = {key: headers[key] for key in ("etag", "last-modified") if key in headers}
+                    
+                    # 等待DOMContentLoaded后正文稳定，不等待load和networkidle
+                    await self.readiness.wait_article(page, timeout=timeout)
+                    self.domain_health.record_latency(domain, "browser", time.monotonic() - start)
                 
-                # 放宽验证条件，不依赖LLM验证，直接返回内容
-                # 只过滤think标签，不过度摘要
-                filtered_text = llm_utils.filter_content(text)
+                # 获取HTML内容，页面仍在跳转时等待新文档
+                return await self.readiness.content(page, timeout=timeout), validators
                 
-                # 确保返回的内容长度合理
-                if len(filtered_text) < 100:
-                    return "【提取失败】"
+            except Exception as e:
+                if not self.browser_pool.page_healthy(page):
+                    # 浏览器 worker 崩溃或被关闭，换一个页面重试，不计入域名失败
+                    print(f"浏览器 worker 不可用 (尝试 {attempt + 1}/{retries}): {e}")
+                    worker_error = e
+                    continue
                 
-                return filtered_text
+                print(f"提取内容失败 (尝试 {attempt + 1}/{retries}): {e}")
+                last_error = e
                 
-            except Exception as e:
-                print(f"提取内容失败 (尝试 {attempt + 1}/{config.MAX_RETRY}): {e}")
+                # 导航或超时失败时页面尚未归还，先释放，避免在重试等待期间占用页面池名额
+                await self._release_page(page)
+                page = None
                 
                 # 处理页面导航问题
-                if "navigating and changing the content" in str(e):
-                    await self._release_page(page)
+                if is_navigation_error(e):
                     continue
                 
-                if attempt == config.MAX_RETRY - 1:
-                    return "【提取失败】"
-                
-                await asyncio.sleep(2)  # 增加重试间隔
+                if attempt < retries - 1:
+                    await asyncio.sleep(2)  # 增加重试间隔
+            finally:
+                await self._release_page(page)
         
-        return "【提取失败】"
+        if last_error is None:
+            raise BrowserUnavailable(f"浏览器 worker 不可用: {worker_error}")
+        raise PageLoadError(f"页面加载失败: {last_error}")
 
-    async def search_bing_rewrite(self, description: str, rewrite_num: int = 5, top_k: int = 5) -> List[SearchResult]:
-        keywords_list = llm_utils.rewrite_keywords(description, rewrite_num)
+    async def _html_to_text(self, html: str) -> str:
+        """从HTML中提取正文，失败或为广告时返回对应标记；解析在进程池中执行"""
+        with metrics.span("html_to_text"):
+            text = await self.extract_pool.extract_text(html)
+        if text in ["【提取失败】", "【广告内容】"]:
+            return text
+        
+        # 放宽验证条件，不依赖LLM验证，直接返回内容
+        # 只过滤think标签，不过度摘要
+        filtered_text = llm_utils.filter_content(text)
+        
+        # 确保返回的内容长度合理
+        if len(filtered_text) < 100:
+            return "【提取失败】"
         
-        all_results = []
-        seen_links = set()
+        return filtered_text
+
+    async def _rewrite_candidates(self, description: str, rewrite_num: int,
+                                  deadline: Optional[Deadline] = None) -> List[SearchResult]:
+        """改写关键词并行获取SERP（不提取正文），融合排序后作为候选结果；超过时间预算时只融合已返回的SERP"""
+        deadline = deadline or Deadline()
+        try:
+            with metrics.span("rewrite"):
+                keywords_list = await deadline.run(llm_utils.arewrite_keywords(description, rewrite_num))
+        except asyncio.TimeoutError:
+            # 改写超时时直接用原描述搜索
+            print(f"关键词改写超过时间预算，使用原描述搜索: {description}")
+            keywords_list = [description]
         
-        for keywords in keywords_list:
+        async def fetch_serp(keywords: str) -> List[SearchResult]:
             try:
-                results = await self.search_bing(keywords, top_k=10)
-                for result in results:
-                    if result.link not in seen_links:
-                        all_results.append(result)
-                        seen_links.add(result.link)
+                # 改写关键词的并行搜索排在直接搜索之后
+                return await self._search_serp(keywords, top_k=10, priority=PRIORITY_FANOUT)
             except Exception as e:
                 print(f"搜索关键词 '{keywords}' 失败: {e}")
-                continue
+                return []
+
+        tasks = [asyncio.create_task(fetch_serp(keywords)) for keywords in keywords_list]
+        _, pending = await asyncio.wait(tasks, timeout=deadline.remaining())
+        for task in pending:
+            task.cancel()
+        if pending:
+            print(f"超过时间预算，放弃 {len(pending)} 个未返回的SERP")
+        ranked_lists = [task.result() for task in tasks if task not in pending]
+        return self._fuse_rankings(ranked_lists)
+
+    async def search_bing_rewrite(self, description: str, rewrite_num: int = 5, top_k: int = 5,
+                                  timeout: Optional[float] = None) -> List[SearchResult]:
+        deadline = Deadline(timeout)
+        candidates = await self._rewrite_candidates(description, rewrite_num, deadline)
+        
+        # 只为融合排序后的前top_k个链接提取正文，提取失败时依次补位，超过时间预算后不再补位
+        valid_results = []
+        while candidates and len(valid_results) < top_k and not deadline.expired:
+            batch = candidates[:top_k - len(valid_results)]
+            candidates = candidates[len(batch):]
+            valid_results.extend(await self._fill_contents(batch, deadline))
+        
+        return valid_results
+
+    async def stream_search_bing(self, keywords: str, top_k: int = 5) -> AsyncIterator[SearchResult]:
+        """与 search_bing 相同，但每个结果的正文提取完成后立即产出（按完成顺序，而非SERP顺序）"""
+        results = await self._search_serp(keywords, top_k)
+        async for result in self._iter_contents(results[:top_k]):
+            yield result
+
+    async def stream_search_bing_rewrite(self, description: str, rewrite_num: int = 5,
+                                         top_k: int = 5) -> AsyncIterator[SearchResult]:
+        """与 search_bing_rewrite 相同，但每个结果的正文提取完成后立即产出，提取失败时同样依次补位"""
+        candidates = await self._rewrite_candidates(description, rewrite_num)
+        
+        produced = 0
+        while candidates and produced < top_k:
+            batch = candidates[:top_k - produced]
+            candidates = candidates[len(batch):]
+            async for result in self._iter_contents(batch):
+                produced += 1
+                yield result
+
+    def _fuse_rankings(self, ranked_lists: List[List[SearchResult]]) -> List[SearchResult]:
+        """倒数排名融合(RRF)：score = Σ 1 / (RRF_K + rank)，多个关键词都靠前的链接排在前面"""
+        scores: Dict[str, float] = {}
+        first_seen: Dict[str, SearchResult] = {}
+        for results in ranked_lists:
+            for rank, result in enumerate(results, start=1):
+                scores[result.link] = scores.get(result.link, 0.0) + 1.0 / (config.RRF_K + rank)
+                first_seen.setdefault(result.link, result)
         
-        return all_results[:top_k]
+        # 分数相同时按首次出现顺序排序（dict保持插入顺序，sorted是稳定排序）
+        ranked_links = sorted(first_seen, key=lambda link: scores[link], reverse=True)
+        return [first_seen[link] for link in ranked_links]
 
 
 # 创建全局实例
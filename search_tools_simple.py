@@ -1,9 +1,11 @@
 import asyncio
-import requests
 from typing import List, Dict, Optional
-from bs4 import BeautifulSoup
+from bing_scheduler import PRIORITY_FANOUT, PRIORITY_INTERACTIVE, bing_scheduler, is_throttled
 from config import config
+from debug_capture import debug_capture
+from http_client import http_client
 from llm_utils import llm_utils
+from serp_parser import parse_serp
 
 
 class SearchResult:
@@ -27,72 +29,45 @@ class BingSearchTool:
         pass
 
     async def init(self):
-        # 不需要初始化，直接使用requests
+        # 不需要初始化，直接使用共享的HTTP客户端
         pass
 
     async def close(self):
-        # 不需要关闭资源
-        pass
+        await http_client.aclose()
 
-    async def search_bing(self, keywords: str, top_k: int = 5) -> List[SearchResult]:
+    async def search_bing(self, keywords: str, top_k: int = 5, priority: int = PRIORITY_INTERACTIVE) -> List[SearchResult]:
         results = []
         
         try:
-            # 直接使用requests库访问Bing搜索
+            # 直接使用共享的异步HTTP客户端访问Bing搜索
             search_url = f"{config.BING_URL}/search?q={keywords}"
-            print(f"使用requests访问搜索URL: {search_url}")
+            print(f"使用HTTP访问搜索URL: {search_url}")
             
-            # 发送请求
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-            }
-            response = requests.get(search_url, headers=headers, timeout=config.TIMEOUT)
+            # 发送请求，经过 Bing 调度器限速
+            await bing_scheduler.acquire(priority)
+            response = await http_client.get(search_url)
             response.encoding = 'utf-8'
             
             print(f"请求状态码: {response.status_code}")
             
-            # 保存页面内容用于调试
-            with open("bing_requests.html", "w", encoding="utf-8") as f:
-                f.write(response.text)
-            print("已保存requests获取的页面到 bing_requests.html")
+            # 按采样保存页面内容用于调试，默认关闭
+            debug_capture.capture("serp_http", response.text, query=keywords, url=search_url)
             
-            # 使用BeautifulSoup解析页面
-            soup = BeautifulSoup(response.text, 'lxml')
+            # 单次遍历解析结果，排除广告，还原Bing跳转链接
+            parsed = parse_serp(response.text, top_k)
+            print(f"找到 {len(parsed)} 个搜索结果")
             
-            # 尝试找到搜索结果
-            # 搜索结果通常在class为b_algo的div中
-            result_divs = soup.find_all("li", class_="b_algo")
-            print(f"找到 {len(result_divs)} 个搜索结果")
+            # 没有结果时检查是否被限流，限流时后续 Bing 请求统一退避
+            if parsed:
+                await bing_scheduler.report_ok()
+            else:
+                reason = is_throttled(response.status_code, str(response.url), response.text)
+                if reason:
+                    await bing_scheduler.report_throttled(reason)
             
-            for result_div in result_divs[:top_k]:
-                try:
-                    # 提取标题和链接
-                    h2 = result_div.find("h2")
-                    if not h2:
-                        continue
-                    
-                    a = h2.find("a", href=True)
-                    if not a:
-                        continue
-                    
-                    title = a.get_text(strip=True)
-                    link = a["href"]
-                    
-                    # 提取摘要
-                    summary = ""
-                    p_tag = result_div.find("p")
-                    if p_tag:
-                        summary = p_tag.get_text(strip=True)
-                    
-                    # 添加到结果中
-                    results.append(SearchResult(title=title, summary=summary, link=link))
-                    print(f"添加结果: {title[:30]}...")
-                    
-                    if len(results) >= top_k:
-                        break
-                except Exception as e:
-                    print(f"解析搜索结果失败: {e}")
-                    continue
+            for item in parsed:
+                results.append(SearchResult(title=item["title"], summary=item["summary"], link=item["link"]))
+                print(f"添加结果: {item['title'][:30]}...")
         except Exception as e:
             print(f"搜索失败: {e}")
         
@@ -111,14 +86,14 @@ class BingSearchTool:
         return valid_results
 
     async def search_bing_rewrite(self, description: str, rewrite_num: int = 5, top_k: int = 5) -> List[SearchResult]:
-        keywords_list = llm_utils.rewrite_keywords(description, rewrite_num)
+        keywords_list = await llm_utils.arewrite_keywords(description, rewrite_num)
         
         all_results = []
         seen_links = set()
         
         for keywords in keywords_list:
             try:
-                results = await self.search_bing(keywords, top_k=10)
+                results = await self.search_bing(keywords, top_k=10, priority=PRIORITY_FANOUT)
                 for result in results:
                     if result.link not in seen_links:
                         all_results.append(result)
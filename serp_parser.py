@@ -0,0 +1,107 @@
+import base64
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+from lxml import etree, html as lxml_html
+
+
+def _has_class(name: str) -> str:
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+
+# 预编译的XPath，一次遍历取出所有自然结果，排除广告区域内的结果
+_RESULTS = etree.XPath(f'//li[{_has_class("b_algo")}][not(ancestor-or-self::*[{_has_class("b_ad")}])]')
+# 兜底：没有 b_algo 时按“包含链接的h2”定位结果
+_FALLBACK_TITLES = etree.XPath(f'//h2[a[@href]][not(ancestor::*[{_has_class("b_ad")}])]')
+# 标题链接只取h2，深层链接（b_deep、b_vList 中的 h3）不作为独立结果
+_TITLE_LINK = etree.XPath('.//h2/a[@href]')
+_CAPTION_SNIPPET = etree.XPath(f'.//*[{_has_class("b_caption")}]//p')
+_ANY_SNIPPET = etree.XPath('.//p')
+
+
+def decode_bing_link(href: str) -> str:
+    """还原 Bing 跳转链接（/ck/a?...&u=a1<base64>）中的真实URL，其他链接原样返回"""
+    if "/ck/a?" not in href:
+        return href
+    try:
+        values = parse_qs(urlparse(href).query).get("u")
+        if not values or not values[0].startswith("a1"):
+            return href
+        encoded = values[0][2:]
+        encoded += "=" * (-len(encoded) % 4)
+        decoded = base64.urlsafe_b64decode(encoded).decode("utf-8")
+        return decoded if decoded.startswith("http") else href
+    except Exception:
+        return href
+
+
+# 在页面内一次性取出所有结果，选择器与上面的XPath保持一致，过滤和去重由 clean_results 完成
+SERP_EXTRACT_SCRIPT = """
+() => {
+    const text = (element) => (element.innerText || element.textContent || "").replace(/\\s+/g, " ").trim();
+    const items = [];
+    for (const container of document.querySelectorAll("li.b_algo")) {
+        if (container.closest(".b_ad")) continue;
+        const link = container.querySelector("h2 a[href]");
+        if (!link) continue;
+        const snippet = container.querySelector(".b_caption p") || container.querySelector("p");
+        items.push({
+            title: text(link),
+            link: link.getAttribute("href"),
+            summary: snippet ? text(snippet) : ""
+        });
+    }
+    return items;
+}
+"""
+
+
+def _text(element) -> str:
+    return " ".join(element.text_content().split())
+
+
+def _parse_result(container, title_link) -> Dict[str, str]:
+    summary = ""
+    snippets = _CAPTION_SNIPPET(container) or _ANY_SNIPPET(container)
+    if snippets:
+        summary = _text(snippets[0])
+    return {"title": _text(title_link), "link": title_link.get("href", ""), "summary": summary}
+
+
+def clean_results(items: List[Dict[str, str]], top_k: int) -> List[Dict[str, str]]:
+    """还原跳转链接，过滤无效结果，按顺序去重并截取前 top_k 个"""
+    results = []
+    seen_links = set()
+    for item in items:
+        title = item.get("title") or ""
+        link = decode_bing_link(item.get("link") or "")
+        if not link.startswith("http") or len(title) < 5 or link in seen_links:
+            continue
+        seen_links.add(link)
+        results.append({"title": title, "link": link, "summary": (item.get("summary") or "")[:150]})
+        if len(results) >= top_k:
+            break
+    return results
+
+
+def parse_serp(page_html: str, top_k: int = 5) -> List[Dict[str, str]]:
+    """解析Bing搜索结果页，返回 title/link/summary 列表，按页面顺序去重"""
+    if not page_html:
+        return []
+    try:
+        document = lxml_html.document_fromstring(page_html)
+    except etree.ParserError:
+        # 空白或只有注释的页面（例如被拦截后的空响应）没有可解析的文档，由调用方按限流检测处理
+        return []
+
+    candidates = []
+    for container in _RESULTS(document):
+        links = _TITLE_LINK(container)
+        if links:
+            candidates.append((container, links[0]))
+    if not candidates:
+        for h2 in _FALLBACK_TITLES(document):
+            container = h2.getparent()
+            if container is not None:
+                candidates.append((container, h2.xpath("a[@href]")[0]))
+
+    return clean_results([_parse_result(container, title_link) for container, title_link in candidates], top_k)
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def connect_shared(path: str) -> sqlite3.Connection:
+    """打开可被多个进程同时读写的SQLite连接（WAL模式，写冲突时等待而不是立即失败）"""
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+class SharedSQLite:
+    """基于共享SQLite文件的存储基类：首次使用时连接并建表，同一连接上的访问由锁串行化，
+    每 PRUNE_EVERY 次写入调用一次 _prune 控制数据库大小
+    """
+
+    PRUNE_EVERY = 100
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.conn: Optional[sqlite3.Connection] = None
+        self.lock = threading.Lock()
+        self.writes = 0
+
+    def _create_schema(self, conn: sqlite3.Connection):
+        """子类在这里建表，首次连接时调用"""
+
+    def _prune(self, conn: sqlite3.Connection):
+        """子类在这里清理过期或超出上限的条目"""
+
+    def _connect(self) -> sqlite3.Connection:
+        """调用方需持有 self.lock"""
+        if self.conn is None:
+            conn = connect_shared(self.path)
+            self._create_schema(conn)
+            conn.commit()
+            self.conn = conn
+        return self.conn
+
+    def _count_write(self, conn: sqlite3.Connection):
+        """记录一次写入，定期清理；在提交前调用，清理与写入在同一事务中"""
+        self.writes += 1
+        if self.writes % self.PRUNE_EVERY == 0:
+            self._prune(conn)
+
+    async def _run(self, func: Callable[..., T], *args) -> T:
+        # SQLite 调用放到线程中执行，避免阻塞事件循环
+        return await asyncio.to_thread(func, *args)
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+
+class SharedCache(SharedSQLite):
+    """跨进程共享的键值缓存，基于SQLite WAL，多 worker 模式下各进程共用同一份SERP缓存"""
+
+    def __init__(self, path: str, ttl: float, max_entries: int):
+        super().__init__(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "stored": 0,
+        }
+
+    def _create_schema(self, conn: sqlite3.Connection):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, "
+            "value BLOB NOT NULL, "
+            "expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires_at ON cache (expires_at)")
+
+    def _prune(self, conn: sqlite3.Connection):
+        # 清理过期和超出数量上限的条目
+        conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM cache WHERE key IN ("
+            "SELECT key FROM cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def get(self, key: str) -> Optional[Any]:
+        with self.lock:
+            row = self._connect().execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def set(self, key: str, value: Any):
+        blob = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"), 6)
+        with self.lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, blob, time.time() + self.ttl)
+            )
+            self._count_write(conn)
+            conn.commit()
+        self.stats["stored"] += 1
+
+    async def aget(self, key: str) -> Optional[Any]:
+        return await self._run(self.get, key)
+
+    async def aset(self, key: str, value: Any):
+        await self._run(self.set, key, value)
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats)
@@ -0,0 +1,58 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """合并进行中的相同请求：同一个 key 同时只执行一次，并发的调用方共享同一个结果
+
+    实际操作运行在独立的任务中，单个调用方被取消不会影响其他等待同一结果的调用方；
+    所有调用方都被取消（例如都已超过时间预算）时才取消实际操作
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.flights: Dict[Hashable, asyncio.Task] = {}
+        self.waiters: Dict[asyncio.Task, int] = {}
+        self.stats = {
+            "calls": 0,
+            "executed": 0,
+            "coalesced": 0,
+            "abandoned": 0,
+        }
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.stats["calls"] += 1
+        task = self.flights.get(key)
+        if task is None:
+            self.stats["executed"] += 1
+            task = asyncio.create_task(fn())
+            self.flights[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+        else:
+            self.stats["coalesced"] += 1
+
+        self.waiters[task] = self.waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self.waiters[task] -= 1
+            if not self.waiters[task]:
+                del self.waiters[task]
+                if not task.done():
+                    # 最后一个调用方也已离开，结果无人使用
+                    self.stats["abandoned"] += 1
+                    if self.flights.get(key) is task:
+                        del self.flights[key]
+                    task.cancel()
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self.flights.get(key) is task:
+            del self.flights[key]
+        # 所有调用方都已取消时没有人读取结果，避免“异常未被读取”的警告
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats["in_flight"] = len(self.flights)
+        return stats
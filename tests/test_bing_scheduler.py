@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+import pytest
+
+from bing_scheduler import PRIORITY_FANOUT, PRIORITY_INTERACTIVE, BingScheduler, is_throttled
+
+
+@pytest.mark.asyncio
+async def test_interactive_requests_are_dispatched_before_fanout():
+    scheduler = BingScheduler(rate=50, burst=1, backoff_base=1, backoff_max=1)
+    await scheduler.acquire()  # 用掉突发令牌，后续请求都需要排队
+    order = []
+
+    async def request(name: str, priority: int):
+        await scheduler.acquire(priority)
+        order.append(name)
+
+    tasks = [asyncio.create_task(request(f"fanout{i}", PRIORITY_FANOUT)) for i in range(2)]
+    await asyncio.sleep(0)
+    tasks += [asyncio.create_task(request(f"interactive{i}", PRIORITY_INTERACTIVE)) for i in range(2)]
+    await asyncio.gather(*tasks)
+
+    assert order == ["interactive0", "interactive1", "fanout0", "fanout1"]
+    assert scheduler.depth() == {"interactive": 0, "fanout": 0}
+    assert scheduler.get_stats()["dispatched"] == 5
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_block_queue():
+    scheduler = BingScheduler(rate=50, burst=1, backoff_base=1, backoff_max=1)
+    await scheduler.acquire()
+
+    cancelled = asyncio.create_task(scheduler.acquire(PRIORITY_INTERACTIVE))
+    waiting = asyncio.create_task(scheduler.acquire(PRIORITY_FANOUT))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    await asyncio.wait_for(waiting, 1)
+
+
+@pytest.mark.asyncio
+async def test_throttle_backs_off_exponentially_until_ok():
+    scheduler = BingScheduler(rate=0, burst=1, backoff_base=0.1, backoff_max=0.15)
+
+    await scheduler.report_throttled("HTTP 429")
+    start = time.monotonic()
+    await scheduler.acquire()
+    assert time.monotonic() - start >= 0.09
+
+    # 连续限流时退避翻倍，但不超过 backoff_max
+    await scheduler.report_throttled("captcha")
+    assert scheduler.consecutive_throttles == 2
+    assert 0.1 < scheduler.get_stats()["backoff_remaining"] <= 0.15
+
+    await scheduler.report_ok()
+    assert scheduler.consecutive_throttles == 0
+
+
+@pytest.mark.asyncio
+async def test_shared_state_pauses_other_processes(tmp_path):
+    path = str(tmp_path / "scheduler.db")
+    first = BingScheduler(rate=0, burst=1, backoff_base=0.1, backoff_max=1, shared_path=path)
+    second = BingScheduler(rate=0, burst=1, backoff_base=0.1, backoff_max=1, shared_path=path)
+    try:
+        await first.report_throttled("captcha")
+        start = time.monotonic()
+        await second.acquire()
+        assert time.monotonic() - start >= 0.09
+        assert second.consecutive_throttles == 1
+    finally:
+        first.close()
+        second.close()
+
+
+@pytest.mark.asyncio
+async def test_shared_token_bucket_is_global(tmp_path):
+    path = str(tmp_path / "scheduler.db")
+    schedulers = [BingScheduler(rate=20, burst=1, backoff_base=1, backoff_max=1, shared_path=path) for _ in range(2)]
+    try:
+        start = time.monotonic()
+        await asyncio.gather(*(scheduler.acquire() for scheduler in schedulers for _ in range(3)))
+        # 两个实例共用每秒20个令牌：6个请求中除第一个外都要等待令牌
+        assert time.monotonic() - start >= 0.2
+    finally:
+        for scheduler in schedulers:
+            scheduler.close()
+
+
+def test_is_throttled_detects_status_codes_and_signatures():
+    assert is_throttled(429, "https://cn.bing.com/search?q=a", "") == "HTTP 429"
+    assert is_throttled(200, "https://cn.bing.com/search?q=a", "<div>Please complete the CAPTCHA</div>") == "captcha"
+    assert is_throttled(200, "https://cn.bing.com/search?q=a", "<ol id='b_results'></ol>") is None
@@ -0,0 +1,67 @@
+import os
+
+import httpx
+import pytest
+
+from extract_worker import extract_text
+from http_client import HttpClient, sniff_meta_charset
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def read_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+def make_client(handler) -> HttpClient:
+    client = HttpClient()
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def test_sniff_meta_charset():
+    assert sniff_meta_charset(b'<meta charset="utf-8">') == "utf-8"
+    assert sniff_meta_charset(b'<meta http-equiv="Content-Type" content="text/html; charset=GB2312">') == "gb18030"
+    assert sniff_meta_charset(b"<meta charset=gbk>") == "gb18030"
+    assert sniff_meta_charset(b'<meta charset="no-such-codec">') is None
+    assert sniff_meta_charset(b"<p>no declaration</p>") is None
+
+
+@pytest.mark.asyncio
+async def test_get_page_decodes_gbk_page_declared_only_in_meta():
+    body = read_fixture("gbk_article.html")
+    client = make_client(lambda request: httpx.Response(200, headers={"content-type": "text/html"}, content=body))
+
+    response = await client.get_page("http://example.com/article", max_bytes=1024 * 1024)
+
+    assert "电动车夏季充电注意事项" in response.text
+    assert "�" not in response.text
+    text, _ = extract_text(response.text, {}, 1.0)
+    assert "新能源汽车动力电池" in text
+
+
+@pytest.mark.asyncio
+async def test_get_page_prefers_charset_from_header():
+    body = '<meta charset="gbk"><p>标题</p>'.encode("utf-8")
+    client = make_client(lambda request: httpx.Response(
+        200, headers={"content-type": "text/html; charset=utf-8"}, content=body))
+
+    response = await client.get_page("http://example.com/", max_bytes=1024)
+
+    assert "标题" in response.text
+
+
+@pytest.mark.asyncio
+async def test_get_page_skips_non_html_and_oversized_bodies():
+    def handler(request):
+        if request.url.path == "/file.pdf":
+            return httpx.Response(200, headers={"content-type": "application/pdf"}, content=b"%PDF" * 100)
+        return httpx.Response(200, headers={"content-type": "text/html"}, content=b"x" * 5000)
+
+    client = make_client(handler)
+
+    assert await client.get_page("http://example.com/file.pdf", max_bytes=1024) is None
+    assert await client.get_page("http://example.com/big", max_bytes=1024) is None
+    assert client.stats["skipped_not_html"] == 1
+    assert client.stats["skipped_too_large"] == 1
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from page_pool import PagePool, PagePoolClosed
+
+
+class FakePage:
+    def __init__(self, name: str):
+        self.name = name
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+def make_pool(max_size: int) -> PagePool:
+    count = 0
+
+    async def create_page():
+        nonlocal count
+        count += 1
+        return FakePage(f"page{count}")
+
+    return PagePool(create_page, max_size)
+
+
+async def queue_waiters(pool: PagePool, count: int, **kwargs):
+    tasks = [asyncio.create_task(pool.acquire(**kwargs)) for _ in range(count)]
+    await asyncio.sleep(0)
+    assert len(pool.waiters) == count
+    return tasks
+
+
+@pytest.mark.asyncio
+async def test_release_hands_page_to_waiters_in_fifo_order():
+    pool = make_pool(1)
+    page = await pool.acquire()
+    first, second, third = await queue_waiters(pool, 3)
+
+    await pool.release(page)
+    assert await first is page
+    await pool.release(page)
+    assert await second is page
+    await pool.release(page)
+    assert await third is page
+    assert pool.stats["created"] == 1
+    assert pool.size == 1
+
+
+@pytest.mark.asyncio
+async def test_cancel_after_handover_passes_page_to_next_waiter():
+    pool = make_pool(1)
+    page = await pool.acquire()
+    first, second = await queue_waiters(pool, 2)
+
+    # 页面已交给第一个等待者，但它在恢复运行前被取消
+    await pool.release(page)
+    first.cancel()
+
+    assert await second is page
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert pool.handing_over == 0
+    assert pool.size == 1
+    assert pool.stats["cancelled"] == 1
+
+
+@pytest.mark.asyncio
+async def test_timeout_removes_waiter_and_keeps_capacity():
+    pool = make_pool(1)
+    page = await pool.acquire()
+
+    with pytest.raises(asyncio.TimeoutError):
+        await pool.acquire(timeout=0.01)
+    assert not pool.waiters
+    assert pool.stats["timeouts"] == 1
+
+    # 超时的等待者不再占用名额，归还的页面回到空闲池
+    await pool.release(page)
+    assert pool.idle_pages == [page]
+    assert await pool.acquire(timeout=0.01) is page
+    assert pool.size == 1
+
+
+@pytest.mark.asyncio
+async def test_discard_gives_slot_back_to_waiter():
+    pool = make_pool(1)
+    page = await pool.acquire()
+    (waiter,) = await queue_waiters(pool, 1)
+
+    await pool.discard(page)
+    replacement = await waiter
+
+    assert page.closed
+    assert replacement is not page
+    assert pool.stats["created"] == 2
+    assert pool.size == 1
+
+
+@pytest.mark.asyncio
+async def test_raising_max_size_wakes_waiters():
+    pool = make_pool(0)
+    first, second = await queue_waiters(pool, 2)
+
+    pool.set_max_size(1)
+    page = await first
+
+    assert not second.done()
+    assert pool.size == 1
+
+    pool.set_max_size(2)
+    assert await second is not page
+    assert pool.size == 2
+
+
+@pytest.mark.asyncio
+async def test_close_fails_queued_waiters():
+    pool = make_pool(1)
+    page = await pool.acquire()
+    (waiter,) = await queue_waiters(pool, 1)
+
+    await pool.close()
+
+    with pytest.raises(PagePoolClosed):
+        await waiter
+    assert page.closed
+    with pytest.raises(PagePoolClosed):
+        await pool.acquire()
@@ -0,0 +1,26 @@
+import pytest
+
+from serp_parser import parse_serp
+
+
+@pytest.mark.parametrize("page_html", ["", "   \n", "<!-- blocked -->"])
+def test_empty_or_comment_only_page_has_no_results(page_html):
+    assert parse_serp(page_html) == []
+
+
+def test_parses_results_and_skips_ads():
+    page_html = """
+    <html><body><ol id="b_results">
+      <li class="b_ad"><h2><a href="https://ad.example.com/">广告</a></h2></li>
+      <li class="b_algo"><h2><a href="https://example.com/a">第一个结果标题</a></h2>
+        <div class="b_caption"><p>摘要A</p></div></li>
+      <li class="b_algo"><h2><a href="https://example.com/b">第二个结果标题</a></h2>
+        <div class="b_caption"><p>摘要B</p></div></li>
+    </ol></body></html>
+    """
+
+    results = parse_serp(page_html, top_k=5)
+
+    assert [result["link"] for result in results] == ["https://example.com/a", "https://example.com/b"]
+    assert results[0]["title"] == "第一个结果标题"
+    assert results[0]["summary"] == "摘要A"
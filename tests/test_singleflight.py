@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+
+    assert results == [1] * 5
+    assert calls == 1
+    assert flight.get_stats() == {"calls": 5, "executed": 1, "coalesced": 4, "abandoned": 0, "in_flight": 0}
+
+
+@pytest.mark.asyncio
+async def test_cancelling_one_waiter_keeps_shared_task_running():
+    flight = SingleFlight("test")
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        return "done"
+
+    first = asyncio.create_task(flight.do("key", fetch))
+    second = asyncio.create_task(flight.do("key", fetch))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await second == "done"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert flight.stats["abandoned"] == 0
+
+
+@pytest.mark.asyncio
+async def test_last_waiter_leaving_cancels_shared_task():
+    flight = SingleFlight("test")
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def fetch():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiters = [asyncio.create_task(flight.do("key", fetch)) for _ in range(2)]
+    await started.wait()
+    for waiter in waiters:
+        waiter.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert flight.stats["abandoned"] == 1
+    assert flight.get_stats()["in_flight"] == 0
+    assert not flight.waiters
+
+    # 被放弃的 key 之后重新执行，而不是复用已取消的任务
+    async def again():
+        return "fresh"
+
+    assert await flight.do("key", again) == "fresh"
+
+
+@pytest.mark.asyncio
+async def test_exception_is_shared_by_all_waiters():
+    flight = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.stats["executed"] == 1